@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+from collections.abc import Callable
+from datetime import UTC, datetime
+
+import polars as pl
+from pydantic_ai import RunContext
+from pydantic_ai.models.test import TestModel
+from pydantic_ai.usage import RunUsage
+
+from main import USER_QUERY, run_investigation
+from src import tools
+from src.game_engine import CluedoGameEngine
+from src.scenario_batch import ScenarioBatch
+from src.scripted_models import ScriptedBackend
+from src.telemetry import TELEMETRY_MODES, configure_telemetry
+from src.tools import GameContext
+
+"""
+Micro benchmarks of the game (no model server needed, the models are scripted).
+Every case is timed with timeit (best of `repeat` rounds of an auto-ranged number of calls) and saved as JSON.
+With --baseline, the results are compared to a previous file and the run fails if a case got slower than the threshold.
+
+uv run benchmark.py --output bench.json
+uv run benchmark.py --baseline bench.json --threshold 0.15
+uv run benchmark.py --filter tool.
+"""
+
+SEED = 7
+
+
+def tool_cases(game: GameContext) -> dict[str, Callable]:
+    """One call with valid arguments for every tool"""
+    ctx = RunContext(deps=game, model=TestModel(), usage=RunUsage())
+    scenario = game.scenario
+    evidence_id = next(iter(scenario.forensic_evidence))
+    return {
+        "tool.get_room_names": tools.get_room_names,
+        "tool.get_suspect_names": tools.get_suspect_names,
+        "tool.get_weapons_names": tools.get_weapons_names,
+        "tool.get_crime_scene_details": lambda: tools.get_crime_scene_details(
+            ctx, scenario.murder_location
+        ),
+        "tool.get_witness_statement": lambda: tools.get_witness_statement(
+            ctx, scenario.murderer
+        ),
+        "tool.get_forensic_evidence": lambda: tools.get_forensic_evidence(
+            ctx, evidence_id
+        ),
+        "tool.get_suspect_background": lambda: tools.get_suspect_background(
+            ctx, scenario.murderer
+        ),
+        "tool.get_timeline_entry": lambda: tools.get_timeline_entry(ctx, "21:30"),
+        "tool.check_fingerprints": lambda: tools.check_fingerprints(
+            ctx, scenario.murder_weapon
+        ),
+        "tool.verify_alibi": lambda: tools.verify_alibi(
+            ctx, scenario.murderer, "21:30"
+        ),
+        "tool.get_tool_list": tools.get_tool_list,
+        "tool.validate_solution": lambda: tools.validate_solution(
+            ctx, scenario.murderer, scenario.murder_weapon, scenario.murder_location
+        ),
+    }
+
+
+def time_case(function: Callable, repeat: int) -> dict:
+    """timeit stats of one case, in microseconds per call"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    per_call = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "best_us": min(per_call),
+        "median_us": statistics.median(per_call),
+        "calls_per_s": 1e6 / min(per_call),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def time_games(n_games: int, conversation: bool = False) -> dict:
+    """Orchestration overhead of run_investigation: scripted models answer instantly,
+    what's left is the loop, the agents, the tools and the telemetry"""
+    backend = ScriptedBackend()
+    per_turn = []
+
+    async def play():
+        for i in range(n_games):
+            result = await run_investigation(
+                USER_QUERY,
+                seed=SEED + i,
+                verbose=False,
+                conversation=conversation,
+                backend=backend,
+            )
+            per_turn.append(result["wall_time"] / result["attempts_used"] * 1e6)
+
+    # with telemetry on, the logfire spans are part of the overhead
+    asyncio.run(play())
+    return {
+        "best_us": min(per_turn),
+        "median_us": statistics.median(per_turn),
+        "calls_per_s": 1e6 / min(per_turn),
+        "number": 1,
+        "repeat": n_games,
+    }
+
+
+def run_benchmarks(repeat: int = 5, games: int = 10, filter: str = "") -> dict:
+    game = GameContext.new(SEED)
+    cases: dict[str, Callable[[], dict]] = {
+        "engine.generate_scenario": lambda: time_case(
+            lambda: CluedoGameEngine(seed=SEED).generate_scenario(), repeat
+        ),
+        "engine.scenario_batch_1000": lambda: time_case(
+            lambda: ScenarioBatch.generate(1000, seed=SEED), repeat
+        ),
+        "game.new": lambda: time_case(lambda: GameContext.new(SEED), repeat),
+    }
+    for name, function in tool_cases(game).items():
+        cases[name] = lambda function=function: time_case(function, repeat)
+    cases["turn.run_investigation"] = lambda: time_games(games)
+    cases["turn.run_investigation_conversation"] = lambda: time_games(
+        games, conversation=True
+    )
+
+    results = {}
+    for name, case in cases.items():
+        if filter in name:
+            results[name] = case()
+            print(f"{name:<40} {results[name]['best_us']:>12.2f} us")
+    return {
+        "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cases": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> pl.DataFrame:
+    """One row per case present in both runs, on the best time (the least noisy).
+    ratio > 1 means slower than the baseline"""
+    rows = []
+    for name, stats in current["cases"].items():
+        if name not in baseline["cases"]:
+            continue
+        before = baseline["cases"][name]["best_us"]
+        ratio = stats["best_us"] / before
+        rows.append(
+            {
+                "case": name,
+                "baseline_us": before,
+                "current_us": stats["best_us"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold,
+            }
+        )
+    return pl.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game and tools")
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--baseline", help="previous results to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="allowed slowdown before a case is a regression (0.10 = 10%%)",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--games", type=int, default=10, help="games played for the turn cases"
+    )
+    parser.add_argument("--filter", default="", help="only run cases containing it")
+    parser.add_argument(
+        "--telemetry",
+        choices=TELEMETRY_MODES,
+        default="logfire",
+        help="compare runs with the same telemetry",
+    )
+    args = parser.parse_args()
+    configure_telemetry(args.telemetry)
+
+    started = time.perf_counter()
+    results = run_benchmarks(args.repeat, args.games, args.filter)
+    results["telemetry"] = args.telemetry
+    print(f"Done in {time.perf_counter() - started:.1f}s, saved to {args.output}")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.threshold)
+        with pl.Config(tbl_rows=-1, fmt_str_lengths=60):
+            print(comparison)
+        if comparison.height and comparison["regression"].any():
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import time
+
+from src.telemetry import TELEMETRY_MODES, configure_telemetry
+
+STARTED = time.perf_counter()
+
+"""
+Command line entry point for one game, quick to start: the arguments are parsed before anything heavy is
+imported, then the game (pydantic-ai and the agents) is imported and timed, logfire is only imported when
+telemetry is on, and the openai client only when an LM Studio model gets its first request.
+
+uv run cli.py --seed 42                        # one game on LM Studio, spans sent to Logfire
+uv run cli.py --seed 42 --telemetry=local      # spans printed to the console, nothing sent
+uv run cli.py --backend scripted --no-telemetry --startup-only  # import and startup time only
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play one Cluedo investigation")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--backend", choices=["lmstudio", "scripted"], default="lmstudio"
+    )
+    parser.add_argument("--latency", type=float, default=0.0, help="scripted only")
+    parser.add_argument(
+        "--telemetry",
+        choices=TELEMETRY_MODES,
+        default="logfire",
+        help="logfire: send the spans, local: print them only, off: no logfire",
+    )
+    parser.add_argument(
+        "--no-telemetry",
+        dest="telemetry",
+        action="store_const",
+        const="off",
+        help="same as --telemetry=off",
+    )
+    parser.add_argument(
+        "--startup-only", action="store_true", help="stop once ready to play"
+    )
+    args = parser.parse_args()
+
+    parsed = time.perf_counter()
+    from main import main as play
+
+    imported = time.perf_counter()
+    telemetry = configure_telemetry(args.telemetry)
+    backend = None
+    if args.backend == "scripted":
+        from src.scripted_models import ScriptedBackend
+
+        backend = ScriptedBackend(latency=args.latency)
+    ready = time.perf_counter()
+    print(
+        f"Startup: imports {imported - parsed:.2f}s, telemetry ({args.telemetry}) {telemetry:.2f}s, "
+        f"ready in {ready - STARTED:.2f}s"
+    )
+    if args.startup_only:
+        return
+
+    asyncio.run(play(args.seed, backend))
+    print(f"Total time: {time.perf_counter() - STARTED:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
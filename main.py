@@ -1,111 +1,595 @@
 import asyncio
-from typing import cast
+import time
+import uuid
+from typing import NamedTuple, cast
 
-import logfire
 from pydantic_ai import usage
+from pydantic_ai.messages import ModelMessage
 
 from src.agents import (
+    AGENTS,
+    BATCH_PROMPT,
+    RESEARCH_TOOLS,
+    SupervisorBatchDecision,
     SupervisorContext,
     SupervisorDecision,
+    override_models,
     research_agent,
     supervisor_agent,
 )
+from src.dispatch import ToolDispatcher
+from src.early_dispatch import EarlyDispatcher
+from src.guard import CycleGuard, GuardPolicy
+from src.memory import SupervisorMemory
+from src.metrics import MeasuredModel, MetricsRegistry, current_metrics
+from src.prefetch import Prefetcher
+from src.prefix_cache import PrefixTracker
+from src.replay import RecordingModel
+from src.research_cache import ResearchCache
+from src.response_cache import ResponseCache
+from src.solution import is_correct
+from src.telemetry import configure_telemetry
+from src.tool_calls import tool_call_keys, tool_parameters
+from src.tool_outputs import OutputFormat
+from src.tool_registry import SchemaMode, ToolSchemas, current_tool_schemas
+from src.tools import GameContext
+from src.traces import TraceWriter, agent_records
 
-logfire.configure()
-logfire.instrument_pydantic_ai()
+NEXT_STEP_PROMPT = """What is the next single step ?
+            - request researcher to use a specific tool
+            - ask processor to analyse current evidence
+            - use validation tool to test a theory
+            - submit final answer (only submit if you validated that your answer is correct)
+            """
+
+USER_QUERY = "Investigate the crime of Dr.Black. Ask your agents do perform research and processing tasks. You should validate your hypothesis using the tool validate_solution() before writing the final report."
+
+
+class Research(NamedTuple):
+    """One research task of a turn"""
+
+    instruction: str
+    text: str
+    messages: list[ModelMessage]  # new messages of the researcher (or their equivalent)
+    usage: usage.RunUsage
+    latency: float
+    cached: bool
+    direct: bool
+    all_messages: list[ModelMessage] | None  # researcher model runs only
 
 
-async def run_investigation(user_query: str):
+def outcome_record(
+    run_id: str,
+    seed: int | None,
+    turns: int,
+    solution: str,
+    submitted: bool,
+    game: GameContext,
+    usage_tracker: usage.RunUsage,
+) -> dict:
+    return {
+        "run_id": run_id,
+        "seed": seed,
+        "event": "outcome",
+        "turn": turns,
+        "timestamp": time.time(),
+        "solution": solution,
+        "submitted": submitted,
+        "solved": submitted and is_correct(solution, game.scenario),
+        "input_tokens": usage_tracker.input_tokens,
+        "output_tokens": usage_tracker.output_tokens,
+        "requests": usage_tracker.requests,
+    }
+
+
+async def run_investigation(
+    user_query: str,
+    seed: int | None = None,
+    backend=None,
+    metrics: MetricsRegistry | None = None,
+    response_cache: ResponseCache | None = None,
+    tracer: TraceWriter | None = None,
+    run_id: str | None = None,
+    record_responses: bool = False,
+    tool_schemas: SchemaMode = "full",
+    tool_subset: bool = False,
+    **options,
+):
+    """Play one game, options are passed to play_investigation.
+    backend: replaces the LM Studio models for this game (see src/scripted_models.py)
+    metrics: records the latency of the models, tools and turns of this game (see src/metrics.py)
+    response_cache: answers the model requests already made from disk (see src/response_cache.py)
+    record_responses: also write every model response to the tracer, to replay the game (see src/replay.py)
+    tool_schemas, tool_subset: compact tool definitions for the researcher, only the tools its instruction
+    points to (see src/tool_registry.py)
+    """
+    run_id = run_id or uuid.uuid4().hex
+    models = backend.models(seed) if backend is not None else {}
+    measured: dict[str, MeasuredModel] = {}
+    if metrics is not None:
+        measured = {
+            name: MeasuredModel(models.get(name, agent.model), name, metrics)
+            for name, agent in AGENTS.items()
+        }
+        models = measured
+    if response_cache is not None:
+        # outside the measures: the latency percentiles only count the real requests
+        models = {
+            name: response_cache.wrap(models.get(name, agent.model))
+            for name, agent in AGENTS.items()
+        }
+    if tracer and record_responses:
+        models = {
+            name: RecordingModel(
+                models.get(name, agent.model), name, tracer, run_id, seed
+            )
+            for name, agent in AGENTS.items()
+        }
+    schemas = ToolSchemas(tool_schemas, tool_subset)
+    token = current_metrics.set(metrics)
+    schemas_token = current_tool_schemas.set(schemas)
+    try:
+        with override_models(models):
+            result = await play_investigation(
+                user_query,
+                seed,
+                tracer=tracer,
+                run_id=run_id,
+                metrics=metrics,
+                measured=measured,
+                **options,
+            )
+    finally:
+        current_metrics.reset(token)
+        current_tool_schemas.reset(schemas_token)
+    result["tool_schemas"] = schemas.report()
+    return result
+
+
+async def play_investigation(
+    user_query: str,
+    seed: int | None = None,
+    verbose: bool = True,
+    memory_budget: int = 1500,
+    conversation: bool = False,
+    tracer: TraceWriter | None = None,
+    run_id: str | None = None,
+    guard: GuardPolicy | None = "hint",
+    research_cache: ResearchCache | None = None,
+    direct_dispatch: bool = False,
+    fan_out: int = 1,
+    prefetch: int = 0,
+    prefetch_research: bool = False,
+    stream: bool = False,
+    output_format: OutputFormat = "verbose",
+    metrics: MetricsRegistry | None = None,
+    measured: dict[str, MeasuredModel] | None = None,
+):
+    """Play one game with the models in place (see run_investigation).
+    conversation: keep the supervisor's message history between turns and only send the new evidence,
+    so the prompt is append-only (system prompt, tools, history) and the server can reuse its prefix cache.
+    The history is the memory in this mode, memory_budget is not used.
+    tracer: records every turn, tool call and the outcome under run_id (see src/traces.py)
+    guard: what to do when the team loops or stalls, None to let it (see src/guard.py)
+    research_cache: answers repeated research without the researcher. One per game by default,
+    a cache passed here is shared by the games of the same seed (see src/research_cache.py)
+    direct_dispatch: call the tool directly when the instruction is unambiguous, the researcher model
+    only gets the other instructions (see src/dispatch.py)
+    fan_out: above 1, the supervisor can ask several research tasks per turn, at most fan_out of them
+    run at the same time. Their findings are added in the order of the decision.
+    prefetch: research the next `prefetch` checklist calls while the supervisor thinks. Only with the
+    direct dispatch (free tool calls), or with prefetch_research (researcher runs) (see src/prefetch.py)
+    stream: stream the supervisor's decision and start the research as soon as its instruction is
+    complete, while the rest is generated (see src/early_dispatch.py)
+    output_format: verbose reports, compact "key: value" lines or JSON for the researcher's tools,
+    the same facts in fewer tokens for the researcher and the supervisor's memory (see src/tool_outputs.py)
+    metrics, measured: registry and wrapped models of the game, to split the turn time between the
+    models and our own code
+    """
+    run_id = run_id or uuid.uuid4().hex
+
+    def log(*args):
+        # tournaments run hundreds of games at once, their prints would interleave
+        if verbose:
+            print(*args)
+
+    started = time.perf_counter()
+    # every run plays its own scenario, the seed makes it reproducible
+    game = GameContext.new(seed, output_format)
     attempts = 0
     max_attempts = 15
-    supervisor_memory = []
+    # findings are deduplicated and compacted to stay under memory_budget tokens
+    supervisor_memory = SupervisorMemory(token_budget=memory_budget)
     research_findings_text = ""
+    supervisor_history = []
+    evidence_sent = 0  # findings already in the supervisor history (conversation mode)
+    prefix_tracker = PrefixTracker()
+    cycle_guard = CycleGuard(tool_parameters(RESEARCH_TOOLS), guard) if guard else None
+    hints = ""
+    if research_cache is None:
+        research_cache = ResearchCache(tool_parameters(RESEARCH_TOOLS))
+        cache_scope = run_id
+    else:
+        cache_scope = run_id if seed is None else f"seed-{seed}"
+    cache_report = {"hits": 0, "misses": 0, "tokens_saved": 0}
+    dispatcher = (
+        ToolDispatcher(RESEARCH_TOOLS, research_agent.model)
+        if direct_dispatch
+        else None
+    )
+    incomplete = "Investigation incomplete - max attempts reached"
+    research_slots = asyncio.Semaphore(fan_out)
+    prefetcher = (
+        Prefetcher(tool_parameters(RESEARCH_TOOLS), prefetch, prefetch_research)
+        if prefetch
+        else None
+    )
+    done_calls: set[str] = set()  # research calls with a finding
+    early = EarlyDispatcher() if stream else None
+    batch_options = (
+        {"output_type": SupervisorBatchDecision, "instructions": BATCH_PROMPT}
+        if fan_out > 1
+        else {}
+    )
+
+    async def compute(
+        instruction: str, spent: usage.RunUsage | None = None, record: bool = True
+    ) -> Research:
+        """Research result of the tool (direct dispatch) or of the researcher.
+        spent: filled with the researcher's tokens as its requests complete; record: count the dispatch"""
+        research_started = time.perf_counter()
+        if dispatcher and (
+            direct := await dispatcher.run(instruction, game, record=record)
+        ):
+            return Research(
+                instruction,
+                direct.output,
+                direct.messages,
+                usage.RunUsage(),
+                time.perf_counter() - research_started,
+                False,
+                True,
+                None,
+            )
+
+        research_findings = await research_agent.run(
+            f"""TASK: {instruction}
+            Use the appropriate tool once, report the result, then stop.
+            Do not investigate further.""",
+            deps=game,
+            usage=spent,
+        )
+        return Research(
+            instruction,
+            str(research_findings.output),
+            research_findings.new_messages(),
+            research_findings.usage(),
+            time.perf_counter() - research_started,
+            False,
+            False,
+            research_findings.all_messages(),
+        )
+
+    async def speculate(instruction: str, spent: usage.RunUsage) -> Research:
+        """compute() for the prefetcher: in a research slot, counted in the dispatch stats once used"""
+        async with research_slots:
+            return await compute(instruction, spent, record=False)
+
+    async def research(instruction: str) -> Research:
+        """Answer of the cache, of a speculation or computed now"""
+        cache_key = research_cache.key(instruction)
+        cached = research_cache.get(cache_scope, cache_key)
+        if cached:
+            log(f"Researcher answer from the cache - {cache_key}")
+            cache_report["hits"] += 1
+            cache_report["tokens_saved"] += cached.tokens
+            return Research(
+                instruction,
+                cached.output,
+                cached.messages,
+                usage.RunUsage(),
+                0.0,
+                True,
+                False,
+                None,
+            )
+
+        cache_report["misses"] += 1
+        speculation = prefetcher.take(cache_key) if prefetcher else None
+        if speculation:
+            log(f"Research prefetched - {cache_key}")
+            # the speculation has its own research slot, waiting for it doesn't take one
+            # the guess was phrased by the checklist, the finding keeps the supervisor's words
+            result = (await speculation)._replace(instruction=instruction)
+            if dispatcher:
+                dispatcher.record(instruction)
+        else:
+            async with research_slots:
+                result = await compute(instruction)
+        if result.direct:
+            log(f"Tool called directly - {tool_call_keys(result.messages)[0]}")
+        research_cache.put(
+            cache_scope,
+            cache_key,
+            result.text,
+            result.messages,
+            result.usage.total_tokens,
+        )
+        return result
+
+    def busy() -> float:
+        """Seconds the models of this game spent in requests so far"""
+        return sum(model.busy for model in (measured or {}).values())
+
+    def record_turn(turn_started: float, busy_before: float):
+        if metrics is not None:
+            elapsed = time.perf_counter() - turn_started
+            metrics.observe("turn_seconds", elapsed)
+            # parallel research or prefetching can be busier than the turn lasted
+            metrics.observe(
+                "turn_overhead_seconds", max(elapsed - (busy() - busy_before), 0.0)
+            )
+
+    def record_game(turns: int):
+        if metrics is not None:
+            metrics.observe("game_turns", turns)
+            metrics.observe("game_seconds", time.perf_counter() - started)
+            metrics.inc("games_total")
 
     # Create a UsageTracker to accumulate token usage across all runs
     usage_tracker = usage.RunUsage()
 
     while attempts < max_attempts:
         attempts += 1
-        print(f"\n--- Turn {attempts}/{max_attempts} ---")
+        log(f"\n--- Turn {attempts}/{max_attempts} ---")
+        turn_started, busy_before = time.perf_counter(), busy()
 
         # supervisor
-        supervisor_response = await supervisor_agent.run(
-            f"""Current evidence collected: {supervisor_memory}
-            What is the next single step ?
-            - request researcher to use a specific tool
-            - ask processor to analyse current evidence
-            - use validation tool to test a theory
-            - submit final answer (only submit if you validated that your answer is correct)
-            """,
-            deps=SupervisorContext(gathered_info=research_findings_text),
-        )
+        if not conversation:
+            prompt = f"""Current evidence collected: {supervisor_memory.render()}
+            {hints}
+            {NEXT_STEP_PROMPT}"""
+        elif not supervisor_history:
+            prompt = f"{user_query}\n{NEXT_STEP_PROMPT}"
+        else:
+            new_evidence = "\n\n".join(supervisor_memory.history[evidence_sent:])
+            prompt = f"""New evidence: {new_evidence or "None"}
+            {hints}
+            What is the next single step ?"""
+        evidence_sent = len(supervisor_memory.history)
+
+        if prefetcher:
+            prefetcher.start(done_calls, speculate, direct=dispatcher is not None)
+
+        supervisor_started = time.perf_counter()
+        supervisor_options = {
+            "message_history": supervisor_history or None,
+            "deps": SupervisorContext(
+                scenario=game.scenario,
+                rng=game.rng,
+                outputs=game.outputs,
+                gathered_info=research_findings_text,
+            ),
+            **batch_options,
+        }
+        if early:
+            async with supervisor_agent.run_stream(
+                prompt, **supervisor_options
+            ) as supervisor_response:
+                async for response, _ in supervisor_response.stream_responses(
+                    debounce_by=None
+                ):
+                    # a delegation the guard blocks doesn't start early
+                    early.watch(
+                        response, research, cycle_guard.allows if cycle_guard else None
+                    )
+                output = await supervisor_response.get_output()
+            early.decided()
+        else:
+            supervisor_response = await supervisor_agent.run(
+                prompt, **supervisor_options
+            )
+            output = supervisor_response.output
+
+        supervisor_latency = time.perf_counter() - supervisor_started
+        decision = cast(SupervisorDecision, output)
+        if tracer:
+            tracer.write(
+                *agent_records(
+                    run_id,
+                    seed,
+                    attempts,
+                    "supervisor",
+                    supervisor_response.usage(),
+                    supervisor_latency,
+                    supervisor_response.new_messages(),
+                    action=decision.action,
+                    instruction=decision.instruction,
+                )
+            )
 
         # Add this run's usage to the tracker
         usage_tracker += supervisor_response.usage()
-        print(f"Supervisor tokens - {supervisor_response.usage()}")
+        log(f"Supervisor tokens - {supervisor_response.usage()}")
+        prefix = prefix_tracker.record(
+            "supervisor",
+            attempts,
+            supervisor_response.all_messages(),
+            history_length=len(supervisor_history),
+        )
+        log(
+            f"Supervisor prompt - {prefix['prompt_tokens']} tokens, {prefix['shared_tokens']} shared with the previous turn"
+        )
+        if conversation:
+            supervisor_history = supervisor_response.all_messages()
+        else:
+            log(f"Memory tokens saved - {supervisor_memory.saved_per_turn[-1]}")
 
-        decision = cast(SupervisorDecision, supervisor_response.output)
-        print(f"Supervisor decision: {decision.action}")
-        print(f"Instruction: {decision.instruction}")
+        log(f"Supervisor decision: {decision.action}")
+        log(f"Instruction: {decision.instruction}")
+        progress = False
+        if cycle_guard:
+            cycle_guard.observe_supervisor(
+                supervisor_response.new_messages(), research_findings_text
+            )
 
         if decision.action == "delegate_to_researcher":
-            print("🔵")
-            research_findings = await research_agent.run(
-                f"""TASK: {decision.instruction}
-                Use the appropriate tool once, report the result, then stop.
-                Do not investigate further."""
+            tasks = list(
+                dict.fromkeys([decision.instruction, *getattr(decision, "tasks", [])])
+            )
+            if cycle_guard:
+                tasks = [task for task in tasks if cycle_guard.before_delegate(task)]
+            if not tasks:
+                log("Guard: redundant delegation skipped")
+            log("🔵" * len(tasks))
+            findings = await asyncio.gather(
+                *((early and early.take(task)) or research(task) for task in tasks)
             )
 
-            # Add researcher's usage to the tracker
-            usage_tracker += research_findings.usage()
-            print(f"Researcher tokens - {research_findings.usage()}")
+            # same order as the decision, whatever finished first
+            for finding in findings:
+                if finding.all_messages is not None:
+                    prefix_tracker.record("researcher", attempts, finding.all_messages)
+                if tracer:
+                    tracer.write(
+                        *agent_records(
+                            run_id,
+                            seed,
+                            attempts,
+                            "researcher",
+                            finding.usage,
+                            finding.latency,
+                            finding.messages,
+                            instruction=finding.instruction,
+                            cached=finding.cached,
+                            direct=finding.direct,
+                        )
+                    )
 
-            research_findings_text = str(research_findings.output)
-            supervisor_memory.append(
-                f"[RESEARCH] {decision.instruction}\nFindings: {research_findings_text}"
-            )
+                # Add researcher's usage to the tracker
+                usage_tracker += finding.usage
+                log(f"Researcher tokens - {finding.usage}")
+
+                if cycle_guard:
+                    progress |= cycle_guard.observe_research(finding.messages)
+                supervisor_memory.add(
+                    attempts,
+                    finding.instruction,
+                    finding.text,
+                    tool_call_keys(finding.messages),
+                )
+                done_calls.update(tool_call_keys(finding.messages))
+            if findings:
+                research_findings_text = "\n\n".join(f.text for f in findings)
 
         elif decision.action == "submit_answer":
-            print("\n" + "=" * 80)
-            print("SUPERVISOR IS SUBMITTING SOLUTION")
-            print("=" * 80)
-            print("\n" + "-" * 80)
-            print("Tokens metadata")
-            print(f"\nTotal Token Usage: {usage_tracker}")
-            print(f"  Request tokens: {usage_tracker.input_tokens}")
-            print(f"  Response tokens: {usage_tracker.output_tokens}")
-            print(f"  Total tokens: {usage_tracker.total_tokens}")
-            print("=" * 80)
+            if prefetcher:
+                await prefetcher.discard()
+                usage_tracker += prefetcher.wasted_usage
+            log("\n" + "=" * 80)
+            log("SUPERVISOR IS SUBMITTING SOLUTION")
+            log("=" * 80)
+            log("\n" + "-" * 80)
+            log("Tokens metadata")
+            log(f"\nTotal Token Usage: {usage_tracker}")
+            log(f"  Request tokens: {usage_tracker.input_tokens}")
+            log(f"  Response tokens: {usage_tracker.output_tokens}")
+            log(f"  Total tokens: {usage_tracker.total_tokens}")
+            log(f"  Memory tokens saved: {supervisor_memory.report()['tokens_saved']}")
+            log(
+                f"  Research cache: {cache_report['hits']} hits, {cache_report['misses']} misses, {cache_report['tokens_saved']} tokens saved"
+            )
+            log("=" * 80)
 
             final_answer = decision.instruction
+            if early:
+                await early.discard()
+            record_turn(turn_started, busy_before)
+            record_game(attempts)
+            if tracer:
+                tracer.write(
+                    outcome_record(
+                        run_id, seed, attempts, final_answer, True, game, usage_tracker
+                    )
+                )
             return {
                 "solution": final_answer,
-                "evidence": supervisor_memory,
+                "evidence": supervisor_memory.history,
                 "attempts_used": attempts,
                 "token_usage": usage_tracker,
+                "wall_time": time.perf_counter() - started,
+                "scenario": game.scenario,
+                "memory": supervisor_memory.report(),
+                "prefix_cache": prefix_tracker.report(),
+                "guard": cycle_guard.report() if cycle_guard else None,
+                "research_cache": cache_report,
+                "dispatch": dispatcher.report() if dispatcher else None,
+                "prefetch": prefetcher.report() if prefetcher else None,
+                "early_dispatch": early.report() if early else None,
+                "submitted": True,
             }
 
-    # Max attempts reached
-    print("\n" + "-" * 80)
-    print("Tokens metadata")
-    print(f"\nTotal Token Usage (incomplete): {usage_tracker}")
-    print(f"  Request tokens: {usage_tracker.input_tokens}")
-    print(f"  Response tokens: {usage_tracker.output_tokens}")
-    print(f"  Total tokens: {usage_tracker.total_tokens}")
+        if early:
+            await early.discard()
+        record_turn(turn_started, busy_before)
+        if cycle_guard:
+            if cycle_guard.end_turn(progress):
+                log("Guard: no progress, the investigation is stopped")
+                incomplete = "Investigation incomplete - stopped by the guard"
+                break
+            hints = cycle_guard.hints()
+            if hints:
+                log(f"Guard hints:\n{hints}")
+
+    # Max attempts reached or stopped
+    if prefetcher:
+        await prefetcher.discard()
+        usage_tracker += prefetcher.wasted_usage
+    record_game(attempts)
+    log("\n" + "-" * 80)
+    log("Tokens metadata")
+    log(f"\nTotal Token Usage (incomplete): {usage_tracker}")
+    log(f"  Request tokens: {usage_tracker.input_tokens}")
+    log(f"  Response tokens: {usage_tracker.output_tokens}")
+    log(f"  Total tokens: {usage_tracker.total_tokens}")
+    log(f"  Memory tokens saved: {supervisor_memory.report()['tokens_saved']}")
+    log(
+        f"  Research cache: {cache_report['hits']} hits, {cache_report['misses']} misses, {cache_report['tokens_saved']} tokens saved"
+    )
 
+    if tracer:
+        tracer.write(
+            outcome_record(
+                run_id,
+                seed,
+                attempts,
+                incomplete,
+                False,
+                game,
+                usage_tracker,
+            )
+        )
     return {
-        "solution": "Investigation incomplete - max attempts reached",
-        "evidence": supervisor_memory,
+        "solution": incomplete,
+        "evidence": supervisor_memory.history,
         "attempts_used": attempts,
         "token_usage": usage_tracker,
+        "wall_time": time.perf_counter() - started,
+        "scenario": game.scenario,
+        "memory": supervisor_memory.report(),
+        "prefix_cache": prefix_tracker.report(),
+        "guard": cycle_guard.report() if cycle_guard else None,
+        "research_cache": cache_report,
+        "dispatch": dispatcher.report() if dispatcher else None,
+        "prefetch": prefetcher.report() if prefetcher else None,
+        "early_dispatch": early.report() if early else None,
+        "submitted": False,
     }
 
 
-async def main():
+async def main(seed: int | None = 42, backend=None):
     # Test the multi-agent workflow
-    result = await run_investigation(
-        "Investigate the crime of Dr.Black. Ask your agents do perform research and processing tasks. You should validate your hypothesis using the tool validate_solution() before writing the final report."
-    )
+    result = await run_investigation(USER_QUERY, seed=seed, backend=backend)
 
     print("\n" + "=" * 80)
     print("FINAL INVESTIGATION REPORT")
@@ -119,4 +603,5 @@ async def main():
 
 
 if __name__ == "__main__":
+    configure_telemetry("logfire")
     asyncio.run(main())
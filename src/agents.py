@@ -1,11 +1,19 @@
+import functools
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
 from typing import Literal
 
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
+from pydantic_ai.models import Model
+from pydantic_ai.models.wrapper import WrapperModel
 
+from src.http_pool import http_client
+from src.metrics import timed_tool
 from src.tools import (
+    TOOL_REGISTRY,
+    GameContext,
     SupervisorContext,
     check_fingerprints,
     get_crime_scene_details,
@@ -39,13 +47,43 @@ Use the GUI if you're not comfortable with the cli, it can all be done there + h
 """
 
 
+LMSTUDIO_URL = "http://127.0.0.1:1234/v1"
+
+
+# one provider and one pooled HTTP client for every agent and game (src/http_pool.py)
+@functools.cache
+def lmstudio_provider():
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    return OpenAIProvider(base_url=LMSTUDIO_URL, http_client=http_client)
+
+
+class LMStudioModel(WrapperModel):
+    """OpenAI chat model of LM Studio, built on its first request.
+    The openai client takes a while to import: runs with other models (scripted, replay) never load it"""
+
+    def __init__(self, model_name: str):
+        Model.__init__(self)
+        self._model_name = model_name
+        self._wrapped: Model | None = None
+
+    @property
+    def wrapped(self) -> Model:
+        if self._wrapped is None:
+            from pydantic_ai.models.openai import OpenAIChatModel
+
+            self._wrapped = OpenAIChatModel(
+                self._model_name, provider=lmstudio_provider()
+            )
+        return self._wrapped
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+
 # Supervisor Agent - orchestrates workflow
-supervisor_model = OpenAIChatModel(
-    model_name="ministral-3-3b-instruct-2512",
-    provider=OpenAIProvider(
-        base_url="http://127.0.0.1:1234/v1",
-    ),
-)
+supervisor_model = LMStudioModel("ministral-3-3b-instruct-2512")
 
 
 class SupervisorDecision(BaseModel):
@@ -55,10 +93,26 @@ class SupervisorDecision(BaseModel):
     instruction: str = Field(description="Simple instruction string")
 
 
-supervisor_agent = Agent(
-    supervisor_model,
-    name="supervisor",
-    system_prompt="""SUPERVISOR - Cluedo Investigation
+class SupervisorBatchDecision(SupervisorDecision):
+    """Decision of the fan-out mode: several independent research tasks in one turn"""
+
+    tasks: list[str] = Field(
+        default_factory=list,
+        description="Other independent research instructions, run at the same time as 'instruction'",
+    )
+
+
+# Added to the supervisor's instructions in the fan-out mode
+BATCH_PROMPT = """You can ask several independent research tasks in one turn:
+put the first one in "instruction" and the others in "tasks", e.g.
+{
+  "action": "delegate_to_researcher",
+  "instruction": "Use get_witness_statement for Mrs White",
+  "tasks": ["Use get_witness_statement for Mr Green", "Use get_witness_statement for Professor Plum"]
+}"""
+
+
+SUPERVISOR_PROMPT = """SUPERVISOR - Cluedo Investigation
 
     You must respond in this format:
     {
@@ -94,33 +148,24 @@ supervisor_agent = Agent(
     □ Only use OPTION 2 when validation passes
 
     FIRST RESPONSE: Use OPTION 1 to ask researcher for suspect list.
- """,
+ """
+
+supervisor_agent = Agent(
+    supervisor_model,
+    name="supervisor",
     deps_type=SupervisorContext,
     output_type=SupervisorDecision,
-    tools=[validate_solution, get_tool_list, process_info],
+    tools=[
+        timed_tool(tool) for tool in [validate_solution, get_tool_list, process_info]
+    ],
 )
 
-research_model = OpenAIChatModel(
-    model_name="lfm2.5-1.2b-instruct-mlx",
-    provider=OpenAIProvider(
-        base_url="http://127.0.0.1:1234/v1",
-    ),
-)
+research_model = LMStudioModel("lfm2.5-1.2b-instruct-mlx")
 
-research_agent = Agent(
-    research_model,
-    name="researcher",
-    system_prompt="""You are a research agent that executes exact instructions.
-    STRICT RULES:
-    1. Do ONLY what the supervisor explicitly requests
-    2. Make EXACTLY ONE tool call per task
-    3. Report only the direct result - no interpretation
-    4. Keep responses under 3 sentences
-    5. Do NOT chain multiple investigations
-    6. Do NOT make assumptions about what else to check
-""",
-    model_settings={"temperature": 0.0},
-    tools=[
+# timed_tool: execution time of each call, when the game records metrics (src/metrics.py)
+RESEARCH_TOOLS = [
+    timed_tool(tool)
+    for tool in [
         get_room_names,
         get_suspect_names,
         get_weapons_names,
@@ -131,22 +176,88 @@ research_agent = Agent(
         get_timeline_entry,
         check_fingerprints,
         verify_alibi,
-    ],
+    ]
+]
+
+RESEARCHER_PROMPT = """You are a research agent that executes exact instructions.
+    STRICT RULES:
+    1. Do ONLY what the supervisor explicitly requests
+    2. Make EXACTLY ONE tool call per task
+    3. Report only the direct result - no interpretation
+    4. Keep responses under 3 sentences
+    5. Do NOT chain multiple investigations
+    6. Do NOT make assumptions about what else to check
+"""
+
+research_agent = Agent(
+    research_model,
+    name="researcher",
+    deps_type=GameContext,
+    model_settings={"temperature": 0.0},
+    tools=RESEARCH_TOOLS,
+    # compact definitions or only the tools of the instruction, when the game asks for it
+    prepare_tools=TOOL_REGISTRY.prepare_tools,
 )
 # Processing Agent - transforms and processes data
-process_model = OpenAIChatModel(
-    model_name="lfm2.5-1.2b-instruct-mlx",
-    provider=OpenAIProvider(
-        base_url="http://127.0.0.1:1234/v1",
-    ),
-)
+process_model = LMStudioModel("lfm2.5-1.2b-instruct-mlx")
+
+PROCESSOR_PROMPT = """Process the information passed to you.
+    Synthetize it, highlight the most important point.
+    Keep it concise
+    DO NOT give instructions or recommendations, you only process"""
 
 process_agent = Agent(
     process_model,
     name="processor",
-    system_prompt="""Process the information passed to you.
-    Synthetize it, highlight the most important point.
-    Keep it concise
-    DO NOT give instructions or recommendations, you only process""",
     model_settings={"temperature": 0.0},
 )
+
+AGENTS = {
+    "supervisor": supervisor_agent,
+    "researcher": research_agent,
+    "processor": process_agent,
+}
+
+
+@contextmanager
+def override_models(models: dict[str, Model]) -> Iterator[None]:
+    """Replace the model of some agents (by name) in the current context.
+    pydantic-ai overrides are context variables: inside an asyncio task they only apply to that task's game"""
+    with ExitStack() as stack:
+        for name, model in models.items():
+            stack.enter_context(AGENTS[name].override(model=model))
+        yield
+
+
+BASE_PROMPTS = {
+    "supervisor": SUPERVISOR_PROMPT,
+    "researcher": RESEARCHER_PROMPT,
+    "processor": PROCESSOR_PROMPT,
+}
+
+# system prompts replacing the base ones in the current context, by agent name (see override_prompts)
+prompt_variants: ContextVar[dict[str, str | None] | None] = ContextVar(
+    "prompt_variants", default=None
+)
+
+
+def system_prompt(name: str):
+    def prompt() -> str:
+        return (prompt_variants.get() or {}).get(name) or BASE_PROMPTS[name]
+
+    return prompt
+
+
+for name, agent in AGENTS.items():
+    agent.system_prompt(system_prompt(name))
+
+
+@contextmanager
+def override_prompts(prompts: dict[str, str | None]) -> Iterator[None]:
+    """Replace the system prompt of some agents (by name) in the current context, None for the base one.
+    Set it around asyncio.run and every game of the loop uses the variants (workers of sweep.py)"""
+    token = prompt_variants.set(prompts)
+    try:
+        yield
+    finally:
+        prompt_variants.reset(token)
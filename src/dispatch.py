@@ -0,0 +1,88 @@
+import inspect
+from collections import Counter
+from collections.abc import Callable
+
+from pydantic_ai import RunContext
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    ToolReturnPart,
+)
+from pydantic_ai.models import Model
+from pydantic_ai.usage import RunUsage
+
+from src.tool_calls import parse_instruction, tool_parameters
+from src.tools import GameContext
+
+"""
+Fast path of the researcher: when the supervisor's instruction names one tool and all its arguments
+("Use get_witness_statement for Mrs White"), the tool is called directly, without the researcher model.
+Ambiguous instructions (several tools or values, missing argument, no tool) still go to the researcher.
+The direct call is returned as the messages the researcher would have produced (tool call + tool return)
+so the memory, cache, guard and traces see no difference.
+"""
+
+
+class DirectResult:
+    def __init__(self, tool_name: str, args: dict[str, str], output: str | dict):
+        call = ToolCallPart(tool_name, args)
+        returned = ToolReturnPart(tool_name, output, tool_call_id=call.tool_call_id)
+        self.output = returned.model_response_str()
+        self.messages: list[ModelMessage] = [
+            ModelResponse(parts=[call], model_name="direct-dispatch"),
+            ModelRequest(parts=[returned]),
+        ]
+
+
+class ToolDispatcher:
+    def __init__(self, functions: list[Callable], model: Model | str):
+        self.functions = {function.__name__: function for function in functions}
+        self.tools = tool_parameters(functions)
+        self.model = model  # only to build the run context, the tools don't call it
+        self.direct: Counter[str] = Counter()  # tool -> direct calls
+        self.fallbacks: Counter[str] = Counter()  # reason -> researcher calls
+
+    async def run(
+        self, instruction: str, deps: GameContext, record: bool = True
+    ) -> DirectResult | None:
+        """Result of the tool the instruction asks for, None to fall back to the researcher.
+        record=False: not counted in the report (speculations, counted by record() once used)"""
+        parsed = parse_instruction(instruction, self.tools)
+        if parsed.problem is not None:
+            if record:
+                self.fallbacks[parsed.problem] += 1
+            return None
+
+        function = self.functions[parsed.tool_name]
+        if "ctx" in inspect.signature(function).parameters:
+            ctx = RunContext(deps=deps, model=self.model, usage=RunUsage())
+            output = function(ctx, **parsed.args)
+        else:
+            output = function(**parsed.args)
+        if inspect.isawaitable(output):
+            output = await output
+
+        if record:
+            self.direct[parsed.tool_name] += 1
+        return DirectResult(parsed.tool_name, parsed.args, output)
+
+    def record(self, instruction: str):
+        """Count the dispatch of an instruction run earlier with record=False"""
+        parsed = parse_instruction(instruction, self.tools)
+        if parsed.problem is not None:
+            self.fallbacks[parsed.problem] += 1
+        else:
+            self.direct[parsed.tool_name] += 1
+
+    def report(self) -> dict:
+        direct = sum(self.direct.values())
+        total = direct + sum(self.fallbacks.values())
+        return {
+            "direct": direct,
+            "fallbacks": sum(self.fallbacks.values()),
+            "hit_rate": round(direct / total, 3) if total else 0.0,
+            "direct_by_tool": dict(self.direct),
+            "fallback_reasons": dict(self.fallbacks),
+        }
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_core import from_json
+
+"""
+Streaming supervisor: its decision is read while it is generated.
+As soon as the partial JSON has the delegate action and a complete instruction, the research of that instruction
+starts and overlaps with the rest of the generation (the other tasks of a fan-out, the closing braces, the
+whitespace small models pad their JSON with).
+When the decision is complete, the early research is used if the instruction is still among the tasks, else
+it is cancelled (wasted). An instruction the guard would block (allowed) is never started early. saved: seconds the used research ran before the decision was complete.
+"""
+
+
+def partial_instruction(
+    response: ModelResponse, output_tool: str = "final_result"
+) -> str | None:
+    """Instruction of a delegation that is already complete in the streamed response, None if not yet"""
+    for part in response.parts:
+        if not isinstance(part, ToolCallPart) or part.tool_name != output_tool:
+            continue
+        args = part.args
+        if isinstance(args, str):
+            try:
+                # incomplete trailing strings are dropped: an instruction here is complete
+                args = from_json(args or "{}", allow_partial=True)
+            except ValueError:
+                return None
+        if not isinstance(args, dict) or args.get("action") != "delegate_to_researcher":
+            return None
+        instruction = args.get("instruction")
+        return instruction if isinstance(instruction, str) and instruction else None
+    return None
+
+
+class EarlyDispatcher:
+    def __init__(self):
+        self.task: asyncio.Task | None = None
+        self.instruction: str | None = None
+        self.started_at = 0.0
+        self.finished_at: float | None = None
+        self.decided_at = 0.0
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+        self.saved = 0.0
+
+    def watch(
+        self,
+        response: ModelResponse,
+        run: Callable[[str], Awaitable],
+        allowed: Callable[[str], bool] | None = None,
+    ):
+        """Start run(instruction) once the streamed response has a complete instruction (once per turn),
+        if allowed(instruction)"""
+        if self.task is not None:
+            return
+        instruction = partial_instruction(response)
+        if instruction is None or (allowed is not None and not allowed(instruction)):
+            return
+
+        async def timed():
+            result = await run(instruction)
+            self.finished_at = time.perf_counter()
+            return result
+
+        self.instruction = instruction
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.task = asyncio.create_task(timed())
+        self.started += 1
+
+    def decided(self):
+        """The supervisor's decision is complete"""
+        self.decided_at = time.perf_counter()
+
+    def take(self, instruction: str) -> asyncio.Task | None:
+        """Early research of this instruction, if one was started"""
+        if self.task is None or instruction != self.instruction:
+            return None
+        task, self.task = self.task, None
+        ended = self.finished_at if self.finished_at is not None else self.decided_at
+        self.saved += max(min(ended, self.decided_at) - self.started_at, 0.0)
+        self.used += 1
+        return task
+
+    async def discard(self):
+        """Cancel an early research the decision didn't keep (end of the turn)"""
+        if self.task is None:
+            return
+        task, self.task = self.task, None
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.wasted += 1
+
+    def report(self) -> dict:
+        return {
+            "started": self.started,
+            "used": self.used,
+            "wasted": self.wasted,
+            "time_saved_s": round(self.saved, 3),
+        }
@@ -0,0 +1,161 @@
+from pathlib import Path
+
+import polars as pl
+
+from src.traces import read_traces
+
+"""
+Features of the trajectory classifier (TODO.md), one row per finished run, from the trace files (src/traces.py).
+Everything is a lazy polars query: the traces are scanned, not loaded, and the result is sunk to parquet.
+Incremental builds only process the runs that are not in the features directory yet; every build adds one part.
+
+    build_features("traces", "features")  # then pl.scan_parquet("features/*.parquet")
+"""
+
+ARGUMENT_SUSPECT = (
+    pl.coalesce(
+        pl.col("tool_args").str.json_path_match("$.suspect_name"),
+        pl.col("tool_args").str.json_path_match("$.witness_name"),
+    )
+    .str.strip_chars()
+    .str.to_lowercase()
+)
+
+
+def tool_call_features(traces: pl.LazyFrame) -> pl.LazyFrame:
+    calls = traces.filter(pl.col("event") == "tool_call").with_columns(
+        suspect=ARGUMENT_SUSPECT
+    )
+
+    # a suspect whose alibi was verified and is still being investigated afterwards
+    verified = (
+        calls.filter(pl.col("alibi_verified"))
+        .group_by("run_id", "suspect")
+        .agg(verified_at=pl.col("index").min())
+    )
+    reinvestigated = (
+        calls.join(verified, on=["run_id", "suspect"])
+        .filter(pl.col("index") > pl.col("verified_at"))
+        .group_by("run_id")
+        .agg(calls_on_verified_suspects=pl.len())
+    )
+
+    per_run = calls.group_by("run_id").agg(
+        total_tool_calls=pl.len(),
+        repeated_tool_calls=pl.len() - pl.struct("tool_name", "tool_args").n_unique(),
+        unique_tool_count=pl.col("tool_name").n_unique(),
+        max_consecutive_same_tool=pl.col("tool_name")
+        .sort_by("index")
+        .rle()
+        .struct.field("len")
+        .max(),
+        parallel_tool_calls=pl.struct("turn", "agent")
+        .filter(pl.struct("turn", "agent").is_duplicated())
+        .n_unique(),
+        tool_success_rate=1 - pl.col("output_error").mean(),
+        avg_tool_response_length=pl.col("output_length").mean(),
+        null_tool_responses=(pl.col("output_length") == 0).sum(),
+    )
+    return per_run.join(reinvestigated, on="run_id", how="left").with_columns(
+        pl.col("calls_on_verified_suspects").fill_null(0),
+        investigated_verified_suspect_flag=pl.col("calls_on_verified_suspects")
+        .fill_null(0)
+        .gt(0),
+    )
+
+
+def agent_features(traces: pl.LazyFrame) -> pl.LazyFrame:
+    runs = traces.filter(pl.col("event").is_in(["supervisor", "researcher"]))
+    return runs.group_by("run_id").agg(
+        total_turns=pl.col("turn").n_unique(),
+        supervisor_runs=(pl.col("event") == "supervisor").sum(),
+        researcher_runs=(pl.col("event") == "researcher").sum(),
+        research_cache_hits=pl.col("cached").sum(),
+        direct_dispatches=pl.col("direct").sum(),
+        repeated_instructions=(
+            pl.col("instruction").filter(pl.col("event") == "supervisor").len()
+            - pl.col("instruction").filter(pl.col("event") == "supervisor").n_unique()
+        ),
+        model_requests=pl.col("requests").sum(),
+        total_latency_s=pl.col("latency_s").sum(),
+        max_latency_s=pl.col("latency_s").max(),
+    )
+
+
+def run_features(traces: pl.LazyFrame) -> pl.LazyFrame:
+    """One row per run with an outcome (unfinished runs are left for a later build)"""
+    traces = traces.with_row_index("index")
+    outcomes = traces.filter(pl.col("event") == "outcome").select(
+        "run_id",
+        "seed",
+        attempts=pl.col("turn"),
+        total_tokens=pl.col("input_tokens") + pl.col("output_tokens"),
+        input_tokens="input_tokens",
+        output_tokens="output_tokens",
+        submitted="submitted",
+        final_answer_correct="solved",
+    )
+    return (
+        outcomes.join(agent_features(traces), on="run_id", how="left")
+        .join(tool_call_features(traces), on="run_id", how="left")
+        .with_columns(
+            pl.col(
+                "total_tool_calls",
+                "repeated_tool_calls",
+                "parallel_tool_calls",
+                "null_tool_responses",
+                "calls_on_verified_suspects",
+            ).fill_null(0),
+            pl.col("investigated_verified_suspect_flag").fill_null(False),
+        )
+        .with_columns(
+            avg_tools_per_turn=pl.col("total_tool_calls")
+            / pl.col("total_turns").clip(lower_bound=1)
+        )
+    )
+
+
+def build_features(
+    traces_dir: str | Path, features_dir: str | Path, incremental: bool = True
+) -> int:
+    """Write the features of the runs in traces_dir to a new parquet part of features_dir.
+    incremental: skip the runs already in features_dir (else the directory is rebuilt).
+    Returns the number of new rows"""
+    features_dir = Path(features_dir)
+    features_dir.mkdir(parents=True, exist_ok=True)
+    parts = sorted(features_dir.glob("part-*.parquet"))
+    if not incremental:
+        for part in parts:
+            part.unlink()
+        parts = []
+
+    traces = read_traces(traces_dir)
+    if parts:
+        done = pl.scan_parquet(parts).select("run_id")
+        # filtering the traces first keeps the old runs out of every aggregation
+        traces = traces.join(done, on="run_id", how="anti")
+
+    path = features_dir / f"part-{len(parts):05d}.parquet"
+    run_features(traces).sink_parquet(path)
+    rows = pl.scan_parquet(path).select(pl.len()).collect().item()
+    if rows == 0:
+        path.unlink()
+    return rows
+
+
+def load_features(features_dir: str | Path) -> pl.LazyFrame:
+    return pl.scan_parquet(Path(features_dir) / "part-*.parquet")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the run features from traces")
+    parser.add_argument("traces", help="directory of the trace files")
+    parser.add_argument("features", help="directory of the feature parquet parts")
+    parser.add_argument("--full", action="store_true", help="rebuild every run")
+    args = parser.parse_args()
+
+    added = build_features(args.traces, args.features, incremental=not args.full)
+    print(f"{added} new runs")
+    print(load_features(args.features).collect())
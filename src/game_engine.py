@@ -103,19 +103,37 @@ class CluedoGameEngine:
         },
     }
 
+    MURDER_TIMES = ("9:00 PM", "9:15 PM", "9:30 PM", "9:45 PM", "10:00 PM")
+    # Items found in the rooms that are not the murder scene
+    SCENE_ITEMS = (
+        "broken glass",
+        "cigarette butt",
+        "torn fabric",
+        "coffee cup",
+        "dropped glove",
+    )
+    # Possible locations during the murder
+    ALIBI_LOCATIONS = ("Dining Room", "Garden", "Hallway", "Bedroom", "Bathroom")
+    # What the innocent witnesses saw or heard (when they noticed something)
+    TESTIMONIES = (
+        "I heard raised voices coming from the {room} around {time}.",
+        "I saw someone leaving the {room} in a hurry around {time}.",
+        "I noticed the {room} door was closed, which was unusual.",
+        "I heard a loud noise from the direction of the {room}.",
+    )
+    NO_TESTIMONY = "I didn't notice anything unusual that evening."
+
     def __init__(self, seed: int | None = None):
-        if seed is not None:
-            random.seed(seed)
+        # each engine has its own generator so concurrent games don't share (or reseed) the global one
+        self.rng = random.Random(seed)
         self.scenario: GameScenario | None = None
 
     def generate_scenario(self) -> GameScenario:
         """Generate a complete murder mystery scenario"""
-        murderer = random.choice(self.SUSPECTS)
-        weapon = random.choice(self.WEAPONS)
-        location = random.choice(self.ROOMS)
-        murder_time = random.choice(
-            ["9:00 PM", "9:15 PM", "9:30 PM", "9:45 PM", "10:00 PM"]
-        )
+        murderer = self.rng.choice(self.SUSPECTS)
+        weapon = self.rng.choice(self.WEAPONS)
+        location = self.rng.choice(self.ROOMS)
+        murder_time = self.rng.choice(self.MURDER_TIMES)
 
         # Generate crime scene evidence for each room
         crime_scene_evidence = self._generate_crime_scene_evidence(
@@ -153,39 +171,15 @@ class CluedoGameEngine:
         evidence = {}
 
         # Evidence in the actual murder room
-        evidence[murder_location] = CrimeSceneEvidence(
-            evidence_id=f"CSE_{murder_location.replace(' ', '_').upper()}_001",
-            item_name=weapon,
-            location=murder_location,
-            description=f"The {weapon.lower()} was found near the victim's body. "
-            f"Shows signs of recent use. Forensic team has collected it for analysis. "
-            f"Blood spatters suggest the attack occurred here. "
-            f"Partial footprint visible near the doorway.",
-        )
+        evidence[murder_location] = self._murder_scene_evidence(murder_location, weapon)
 
         # Evidence in other rooms (potential red herrings or supporting clues)
         for room in self.ROOMS:
             if room != murder_location:
                 # Some rooms have evidence, some don't
-                if random.random() < 0.6:
-                    item = random.choice(
-                        [
-                            "broken glass",
-                            "cigarette butt",
-                            "torn fabric",
-                            "coffee cup",
-                            "dropped glove",
-                        ]
-                    )
-                    evidence[room] = CrimeSceneEvidence(
-                        evidence_id=f"CSE_{room.replace(' ', '_').upper()}_001",
-                        item_name=item,
-                        location=room,
-                        description=f"A {item} was found in the {room}. "
-                        f"May or may not be related to the crime. "
-                        f"Room shows signs of recent activity. "
-                        f"No obvious signs of struggle.",
-                    )
+                if self.rng.random() < 0.6:
+                    item = self.rng.choice(self.SCENE_ITEMS)
+                    evidence[room] = self._room_evidence(room, item)
 
         return evidence
 
@@ -195,50 +189,34 @@ class CluedoGameEngine:
         """Generate witness statements for all suspects"""
         statements = {}
 
-        # Possible locations during the murder
-        alibi_locations = ["Dining Room", "Garden", "Hallway", "Bedroom", "Bathroom"]
-
         for suspect in self.SUSPECTS:
             if suspect == murderer:
                 # Murderer has a false alibi
-                false_location = random.choice([loc for loc in alibi_locations])
-                statements[suspect] = WitnessStatement(
-                    witness_name=suspect,
-                    alibi=f"I was in the {false_location} reading a book at {murder_time}.",
-                    testimony="I heard nothing unusual. I was completely absorbed in my reading."
-                    "I didn't see Dr. Black at all that evening.",
-                    location_during_murder=false_location,
-                    time_of_statement="10:30 PM",
+                false_location = self.rng.choice(self.ALIBI_LOCATIONS)
+                statements[suspect] = self._murderer_statement(
+                    suspect, false_location, murder_time
                 )
             else:
                 # Innocent suspects have various alibis
-                alibi_location = random.choice(alibi_locations)
+                alibi_location = self.rng.choice(self.ALIBI_LOCATIONS)
 
                 # Some witnesses saw/heard something useful
-                if random.random() < 0.5:
-                    testimony = random.choice(
-                        [
-                            f"I heard raised voices coming from the {murder_location} around {murder_time}.",
-                            f"I saw someone leaving the {murder_location} in a hurry around {murder_time}.",
-                            f"I noticed the {murder_location} door was closed, which was unusual.",
-                            f"I heard a loud noise from the direction of the {murder_location}.",
-                        ]
+                if self.rng.random() < 0.5:
+                    testimony = self.rng.choice(self.TESTIMONIES).format(
+                        room=murder_location, time=murder_time
                     )
                 else:
-                    testimony = "I didn't notice anything unusual that evening."
-
-                statements[suspect] = WitnessStatement(
-                    witness_name=suspect,
-                    alibi=f"I was in the {alibi_location} at {murder_time}.",
-                    testimony=testimony,
-                    location_during_murder=alibi_location,
-                    time_of_statement="10:30 PM",
+                    testimony = self.NO_TESTIMONY
+
+                statements[suspect] = self._witness_statement(
+                    suspect, alibi_location, murder_time, testimony
                 )
 
         return statements
 
+    @staticmethod
     def _generate_forensic_evidence(
-        self, weapon: WeaponType, location: RoomType, murderer: SuspectType
+        weapon: WeaponType, location: RoomType, murderer: SuspectType
     ) -> dict[str, ForensicEvidence]:
         """Generate detailed forensic analysis"""
         evidence = {}
@@ -298,12 +276,75 @@ class CluedoGameEngine:
         self, murderer: SuspectType, weapon: WeaponType, location: RoomType
     ) -> list[str]:
         """Generate misleading clues"""
-        herrings = [
-            f"A {random.choice([w for w in self.WEAPONS if w != weapon])} was found in the hallway.",
-            f"{random.choice([s for s in self.SUSPECTS if s != murderer])} was seen arguing with Dr. Black earlier.",
-            f"Strange noises were reported from the {random.choice([r for r in self.ROOMS if r != location])} that evening.",
+        herrings = self._red_herrings_pool(
+            self.rng.choice([w for w in self.WEAPONS if w != weapon]),
+            self.rng.choice([s for s in self.SUSPECTS if s != murderer]),
+            self.rng.choice([r for r in self.ROOMS if r != location]),
+        )
+
+        return self.rng.sample(herrings, 3)
+
+    # Builders shared with the bulk generator (src/scenario_batch.py): they take the random draws and only build the objects
+
+    @staticmethod
+    def _murder_scene_evidence(
+        room: RoomType, weapon: WeaponType
+    ) -> CrimeSceneEvidence:
+        return CrimeSceneEvidence(
+            evidence_id=f"CSE_{room.replace(' ', '_').upper()}_001",
+            item_name=weapon,
+            location=room,
+            description=f"The {weapon.lower()} was found near the victim's body. "
+            f"Shows signs of recent use. Forensic team has collected it for analysis. "
+            f"Blood spatters suggest the attack occurred here. "
+            f"Partial footprint visible near the doorway.",
+        )
+
+    @staticmethod
+    def _room_evidence(room: RoomType, item: str) -> CrimeSceneEvidence:
+        return CrimeSceneEvidence(
+            evidence_id=f"CSE_{room.replace(' ', '_').upper()}_001",
+            item_name=item,
+            location=room,
+            description=f"A {item} was found in the {room}. "
+            f"May or may not be related to the crime. "
+            f"Room shows signs of recent activity. "
+            f"No obvious signs of struggle.",
+        )
+
+    @staticmethod
+    def _murderer_statement(
+        suspect: SuspectType, false_location: str, murder_time: str
+    ) -> WitnessStatement:
+        return WitnessStatement(
+            witness_name=suspect,
+            alibi=f"I was in the {false_location} reading a book at {murder_time}.",
+            testimony="I heard nothing unusual. I was completely absorbed in my reading."
+            "I didn't see Dr. Black at all that evening.",
+            location_during_murder=false_location,
+            time_of_statement="10:30 PM",
+        )
+
+    @staticmethod
+    def _witness_statement(
+        suspect: SuspectType, alibi_location: str, murder_time: str, testimony: str
+    ) -> WitnessStatement:
+        return WitnessStatement(
+            witness_name=suspect,
+            alibi=f"I was in the {alibi_location} at {murder_time}.",
+            testimony=testimony,
+            location_during_murder=alibi_location,
+            time_of_statement="10:30 PM",
+        )
+
+    @staticmethod
+    def _red_herrings_pool(
+        decoy_weapon: WeaponType, decoy_suspect: SuspectType, decoy_room: RoomType
+    ) -> list[str]:
+        return [
+            f"A {decoy_weapon} was found in the hallway.",
+            f"{decoy_suspect} was seen arguing with Dr. Black earlier.",
+            f"Strange noises were reported from the {decoy_room} that evening.",
             "An unidentified person was seen leaving the mansion around midnight.",
             "Dr. Black had recently changed his will, leaving everything to charity.",
         ]
-
-        return random.sample(herrings, 3)
@@ -0,0 +1,153 @@
+import re
+from collections import Counter
+from typing import Literal
+
+from pydantic_ai.messages import ModelMessage
+
+from src.tool_calls import parse_instruction, tool_call_key, tool_results
+from src.traces import alibi_verified
+
+"""
+Online guard against wasted turns. It keeps a few sets and counters (constant work per turn) and spots:
+- repeated_call: a research tool call (or validate_solution) already made with the same arguments
+- same_tool: the same research tool many turns in a row
+- cleared_suspect: research on a suspect whose alibi was verified
+- unchanged_process_info: process_info called again on the same researcher output
+- no_progress: turns without any new finding
+Policy:
+- hint: the issues are added to the next supervisor prompt
+- force: hint, and a delegation that surely repeats a call (one tool, all its arguments) is not sent to the researcher
+- stop: force, and the run ends after max_idle_turns turns without progress
+"""
+
+GuardPolicy = Literal["hint", "force", "stop"]
+
+
+class CycleGuard:
+    def __init__(
+        self,
+        tools: dict[str, list[str]],
+        policy: GuardPolicy = "hint",
+        max_same_tool: int = 6,
+        max_idle_turns: int = 3,
+    ):
+        self.tools = tools  # research tool -> arguments, to predict the delegated call
+        self.policy = policy
+        self.max_same_tool = max_same_tool
+        self.max_idle_turns = max_idle_turns
+
+        self.seen_calls: set[str] = set()
+        self.cleared: set[str] = set()  # suspects (lower case) with a verified alibi
+        self.last_tool: str | None = None
+        self.same_tool_run = 0
+        self.processed_info: str | None = None
+        self.idle_turns = 0
+        self.pending: list[str] = []  # hints for the next supervisor prompt
+        self.issues: Counter[str] = Counter()
+        self.blocked = 0
+        self.stopped = False
+
+    def _flag(self, issue: str, hint: str):
+        self.issues[issue] += 1
+        self.pending.append(hint)
+
+    def _repeated(self, instruction: str) -> str | None:
+        """Key of the call the instruction surely repeats (one tool, all its arguments), else None.
+        The best guess of an ambiguous instruction is not a repeat"""
+        parsed = parse_instruction(instruction, self.tools)
+        if parsed.problem is not None:
+            return None
+        key = tool_call_key(parsed.tool_name, parsed.args)
+        return key if key in self.seen_calls else None
+
+    def allows(self, instruction: str) -> bool:
+        """before_delegate without counting or hinting, for the research started before the decision"""
+        return self.policy == "hint" or self._repeated(instruction) is None
+
+    def before_delegate(self, instruction: str) -> bool:
+        """False if the delegation is redundant and the policy doesn't allow it"""
+        key = self._repeated(instruction)
+        redundant = key is not None and self.policy != "hint"
+        if redundant:
+            self.blocked += 1
+            self._flag(
+                "repeated_call",
+                f"{key} was already done, its result is in the evidence. Ask for something else.",
+            )
+        return not redundant
+
+    def observe_supervisor(self, messages: list[ModelMessage], gathered_info: str):
+        for call, _ in tool_results(messages):
+            if call.tool_name == "process_info":
+                if gathered_info == self.processed_info:
+                    self._flag(
+                        "unchanged_process_info",
+                        "process_info was already called on this information, gather new evidence first.",
+                    )
+                self.processed_info = gathered_info
+            elif call.tool_name == "validate_solution":
+                key = tool_call_key(call.tool_name, call.args_as_dict())
+                if key in self.seen_calls:
+                    self._flag(
+                        "repeated_call",
+                        f"{key} was already validated, change the hypothesis.",
+                    )
+                self.seen_calls.add(key)
+
+    def observe_research(self, messages: list[ModelMessage]) -> bool:
+        """Register the researcher's tool calls, True if one of them is new"""
+        progress = False
+        for call, output in tool_results(messages):
+            args = call.args_as_dict()
+            key = tool_call_key(call.tool_name, args)
+            if key in self.seen_calls:
+                self._flag("repeated_call", f"{key} was already done.")
+            else:
+                progress = True
+            self.seen_calls.add(key)
+
+            suspect = str(args.get("suspect_name") or args.get("witness_name") or "")
+            suspect = re.sub(r"\s+", " ", suspect).strip().lower()
+            if suspect in self.cleared and call.tool_name != "verify_alibi":
+                self._flag(
+                    "cleared_suspect",
+                    f"{suspect.title()}'s alibi is verified, focus on the other suspects.",
+                )
+            if alibi_verified(output) and suspect:
+                self.cleared.add(suspect)
+
+            if call.tool_name == self.last_tool:
+                self.same_tool_run += 1
+            else:
+                self.last_tool, self.same_tool_run = call.tool_name, 1
+            if self.same_tool_run == self.max_same_tool:
+                self._flag(
+                    "same_tool",
+                    f"{call.tool_name} was used {self.same_tool_run} times in a row, try another tool.",
+                )
+        return progress
+
+    def end_turn(self, progress: bool) -> bool:
+        """Close the turn, True if the run should stop"""
+        self.idle_turns = 0 if progress else self.idle_turns + 1
+        if self.idle_turns >= self.max_idle_turns:
+            self._flag(
+                "no_progress",
+                f"No new evidence for {self.idle_turns} turns. Validate a hypothesis or research something new.",
+            )
+            self.stopped = self.policy == "stop"
+        return self.stopped
+
+    def hints(self) -> str:
+        """Hints for the next supervisor prompt (once), empty if none"""
+        hints = "\n".join(f"⚠️ {hint}" for hint in dict.fromkeys(self.pending))
+        self.pending = []
+        return hints
+
+    def report(self) -> dict:
+        return {
+            "policy": self.policy,
+            "issues": dict(self.issues),
+            "blocked_delegations": self.blocked,
+            "stopped": self.stopped,
+        }
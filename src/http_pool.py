@@ -0,0 +1,94 @@
+import httpx
+from pydantic import BaseModel
+
+"""
+One HTTP client for every agent and every concurrent game.
+The 3 providers of src/agents.py share a keep-alive connection pool to LM Studio: requests reuse idle
+connections instead of opening new sockets, and the number of sockets is capped (max_connections, the other
+requests wait for a free connection). The limits and timeouts can be changed before the games start:
+
+    http_transport.configure(HTTPSettings(max_connections=8))
+    ...
+    print(http_transport.report())  # requests, connections opened, reuse ratio
+"""
+
+
+class HTTPSettings(BaseModel):
+    max_connections: int = 32  # open sockets to the model server
+    max_keepalive_connections: int = 16  # idle sockets kept for the next requests
+    keepalive_expiry: float = 30.0  # seconds an idle socket is kept
+    connect_timeout: float = 5.0
+    read_timeout: float = 300.0  # a long generation on a small machine
+    pool_timeout: float | None = None  # wait for a free connection, None: no limit
+
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.connect_timeout,
+            pool=self.pool_timeout,
+        )
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+
+class PooledTransport(httpx.AsyncBaseTransport):
+    """Connection pool with its settings and reuse statistics"""
+
+    def __init__(self, settings: HTTPSettings | None = None):
+        self.pools: list[httpx.AsyncHTTPTransport] = []
+        self.configure(settings or HTTPSettings())
+        self.requests = 0
+        self.connections_opened = 0
+        self.active = 0
+        self.peak_active = 0
+
+    def configure(self, settings: HTTPSettings):
+        """New limits and timeouts. Only the requests sent afterwards use them"""
+        self.settings = settings
+        self.pool = httpx.AsyncHTTPTransport(limits=settings.limits())
+        self.pools.append(self.pool)
+
+    async def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        # the openai client sends its own timeout with each request, ours wins, unless the request
+        # asks to keep its own (extensions={"own_timeout": True}, e.g. the router's health checks)
+        if not request.extensions.get("own_timeout"):
+            request.extensions["timeout"] = self.settings.timeout().as_dict()
+        request.extensions["trace"] = self._trace
+        self.requests += 1
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            return await self.pool.handle_async_request(request)
+        finally:
+            # counted until the headers arrive, the body is read afterwards
+            self.active -= 1
+
+    async def aclose(self):
+        for pool in self.pools:
+            await pool.aclose()
+
+    def report(self) -> dict:
+        reused = max(self.requests - self.connections_opened, 0)
+        return {
+            "requests": self.requests,
+            "connections_opened": self.connections_opened,
+            "reused": reused,
+            "reuse_ratio": round(reused / self.requests, 3) if self.requests else 0.0,
+            "peak_requests_in_flight": self.peak_active,
+        }
+
+
+http_transport = PooledTransport()
+http_client = httpx.AsyncClient(
+    transport=http_transport, timeout=http_transport.settings.timeout()
+)
@@ -0,0 +1,174 @@
+import re
+
+from pydantic import BaseModel
+
+from src.tokens import estimate_tokens
+
+"""
+Memory of the supervisor.
+Before, the supervisor prompt carried the repr of every finding since the first turn, so the prompt grew every turn
+and the total tokens of a run grew quadratically.
+Here:
+- a finding replaces the previous one of the same tool call (or the same text when the researcher used no tool)
+- the last `keep_recent` findings are kept in full, the older ones are compacted into one line facts:
+  the flagged lines (⚠️) and the key fields of the tool (item found, alibi, location...), read from the
+  verbose, compact or JSON outputs. A finding without them (a researcher's own words) keeps its start
+- if the rendered memory is still over the token budget, the oldest facts are dropped, then the recent
+  findings are compacted too, then their facts are dropped except the latest one
+The full evidence trail is still kept in `history` for the final report.
+"""
+
+FACT_LENGTH = 160  # characters kept from a finding without key fields
+FIELD_LENGTH = 120  # characters kept per key field
+
+# key fields of each tool: name in the fact -> labels in the verbose, compact and JSON outputs
+KEY_FIELDS = {
+    "get_crime_scene_details": {
+        "item": ["Item Found", "item"],
+        "evidence_id": ["Evidence ID", "evidence_id"],
+        "evidence": ["evidence"],
+    },
+    "get_witness_statement": {
+        "location": ["REPORTED LOCATION DURING INCIDENT", "location"],
+        "alibi": ["ALIBI", "alibi"],
+        "testimony": ["TESTIMONY", "testimony"],
+    },
+    "get_forensic_evidence": {
+        "item": ["ITEM", "item"],
+        "findings": ["FINDINGS", "findings"],
+        "significance": ["SIGNIFICANCE", "significance"],
+    },
+    "get_suspect_background": {
+        "opportunity": ["opportunity"],
+        "notes": ["notes"],
+    },
+    "get_timeline_entry": {"event": ["event"]},
+    "check_fingerprints": {
+        "matches": ["matches"],
+        "analysis": ["analysis"],
+    },
+    "verify_alibi": {
+        "alibi_verified": ["alibi_verified"],
+        "claimed_location": ["claimed_location"],
+        "confidence": ["confidence"],
+    },
+}
+FLAG = re.compile(r'⚠️[^"\n]*')  # a flag ends with its line or its JSON string
+BANNER = re.compile(r"^[=\-]{3,}$", re.MULTILINE)
+
+
+def field(text: str, label: str) -> str | None:
+    """Value of a field: "label": value (JSON), label: value or a heading line followed by its value"""
+    quoted = re.escape(label)
+    found = re.search(
+        rf'"{quoted}"\s*:\s*(?:"((?:[^"\\]|\\.)*)"|\[([^\]]*)\]|([^,}}]+))', text
+    )
+    if found:
+        value = next(group for group in found.groups() if group is not None)
+        return value.replace('"', "").strip()
+    found = re.search(rf"^[-\s]*{quoted}\s*:[ \t]*\n?[ \t]*(\S.*)$", text, re.MULTILINE)
+    return found.group(1).strip() if found else None
+
+
+def key_fields(tool_key: str, text: str) -> list[str]:
+    """name=value of the key fields of the tools called, found in the text"""
+    fields = {}
+    for tool in re.findall(r"(\w+)\(", tool_key):
+        for name, labels in KEY_FIELDS.get(tool, {}).items():
+            value = next(filter(None, (field(text, label) for label in labels)), None)
+            if value and name not in fields:
+                fields[name] = value[:FIELD_LENGTH]
+    return [f"{name}={value}" for name, value in fields.items()]
+
+
+class Finding(BaseModel):
+    key: str  # normalized tool calls of the research, or its text if no tool was called
+    instruction: str
+    findings: str
+    turn: int
+
+
+def compact(finding: Finding) -> str:
+    """One line fact: tool call, flagged lines (⚠️ ...) and the key fields of the tool,
+    else the start of the findings"""
+    flagged = [flag.strip() for flag in FLAG.findall(finding.findings)]
+    fields = key_fields(finding.key, finding.findings)
+    if fields:
+        summary = "; ".join(fields)
+    else:
+        text = re.sub(r"\s+", " ", BANNER.sub("", finding.findings)).strip()
+        summary = text[:FACT_LENGTH] + ("..." if len(text) > FACT_LENGTH else "")
+    if flagged:
+        summary = " | ".join(flagged) + " | " + summary
+    return f"- (turn {finding.turn}) {finding.key}: {summary}"
+
+
+class SupervisorMemory:
+    def __init__(self, token_budget: int = 1500, keep_recent: int = 3):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.findings: dict[str, Finding] = {}  # ordered from oldest to latest
+        self.history: list[str] = []
+        self.duplicates = 0
+        self.dropped: set[str] = set()  # findings that no longer fit in the budget
+        self.saved_per_turn: list[int] = []
+
+    def add(self, turn: int, instruction: str, findings: str, tool_keys: list[str]):
+        self.history.append(f"[RESEARCH] {instruction}\nFindings: {findings}")
+
+        key = " + ".join(tool_keys) or re.sub(r"\s+", " ", findings).strip().lower()
+        previous = self.findings.pop(key, None)
+        if previous is not None and previous.findings == findings:
+            self.duplicates += 1
+        self.findings[key] = Finding(
+            key=key, instruction=instruction, findings=findings, turn=turn
+        )
+
+    def render(self) -> str:
+        """Evidence for the supervisor prompt, within the token budget"""
+        entries = list(self.findings.values())
+        split = max(len(entries) - self.keep_recent, 0)
+        older, recent = entries[:split], entries[split:]
+        facts = [(f.key, compact(f)) for f in older]
+
+        def assemble() -> str:
+            parts = []
+            if facts:
+                parts.append("Earlier findings:\n" + "\n".join(f for _, f in facts))
+            parts.extend(
+                f"[RESEARCH] {f.instruction}\nFindings: {f.findings}" for f in recent
+            )
+            return "\n\n".join(parts) if parts else "None yet"
+
+        def over() -> bool:
+            return estimate_tokens(rendered) > self.token_budget
+
+        rendered = assemble()
+        while facts and over():
+            key, _ = facts.pop(0)
+            self.dropped.add(key)
+            rendered = assemble()
+        # the recent findings alone can be over the budget: compact them, oldest first
+        while recent and over():
+            finding = recent.pop(0)
+            facts.append((finding.key, compact(finding)))
+            rendered = assemble()
+        # the latest finding stays, at least as a fact
+        while len(facts) > 1 and over():
+            key, _ = facts.pop(0)
+            self.dropped.add(key)
+            rendered = assemble()
+
+        # what the prompt would have cost with the raw list of every finding
+        naive = estimate_tokens(str(self.history))
+        self.saved_per_turn.append(max(naive - estimate_tokens(rendered), 0))
+        return rendered
+
+    def report(self) -> dict:
+        return {
+            "findings_kept": len(self.findings),
+            "duplicates": self.duplicates,
+            "facts_dropped": len(self.dropped),
+            "tokens_saved_per_turn": self.saved_per_turn,
+            "tokens_saved": sum(self.saved_per_turn),
+        }
@@ -0,0 +1,255 @@
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import polars as pl
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+"""
+In-process metrics: latency distributions (p50/p95/p99) and counters, exported as Prometheus text
+(a file or an endpoint on localhost) and summarized as a polars table.
+- model_request_seconds{agent}: a model request, model_ttft_seconds{agent}: time to first token (streamed requests)
+- model_prefill_tokens_per_second / model_decode_tokens_per_second{agent}: input tokens over the time to first
+  token and output tokens over the rest of the request (streamed), or over the whole request otherwise
+- tool_seconds{tool}: execution of a tool
+- turn_seconds / turn_overhead_seconds: a turn, and the part of it not spent waiting on a model (our code)
+- game_turns, games_total, games_per_minute
+"""
+
+QUANTILES = (0.5, 0.95, 0.99)
+MAX_SAMPLES = 10_000  # per series, the oldest samples are forgotten
+
+# registry of the running game, for the tools that don't receive it
+current_metrics: ContextVar["MetricsRegistry | None"] = ContextVar(
+    "current_metrics", default=None
+)
+
+
+class Series:
+    """Samples of one metric with one set of labels"""
+
+    def __init__(self):
+        self.samples: deque[float] = deque(maxlen=MAX_SAMPLES)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> float:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.series: dict[tuple[str, tuple[tuple[str, str], ...]], Series] = {}
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()  # sync tools run in threads
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.series.setdefault(key, Series()).observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def games_per_minute(self) -> float:
+        games = self.counters.get(("games_total", ()), 0)
+        return games / (time.perf_counter() - self.started) * 60
+
+    def summary(self) -> pl.DataFrame:
+        """One row per series"""
+        with self._lock:
+            rows = [
+                {
+                    "metric": name,
+                    "labels": ",".join(f"{k}={v}" for k, v in labels),
+                    "count": series.count,
+                    "mean": series.total / series.count,
+                    **{f"p{int(q * 100)}": series.quantile(q) for q in QUANTILES},
+                }
+                for (name, labels), series in sorted(self.series.items())
+            ]
+        return pl.DataFrame(
+            rows,
+            schema={
+                "metric": pl.String,
+                "labels": pl.String,
+                "count": pl.Int64,
+                "mean": pl.Float64,
+                **{f"p{int(q * 100)}": pl.Float64 for q in QUANTILES},
+            },
+        )
+
+    def to_prometheus(self) -> str:
+        def render_labels(labels: tuple, extra: str = "") -> str:
+            parts = [f'{k}="{v}"' for k, v in labels] + ([extra] if extra else [])
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), series in sorted(self.series.items()):
+                metric = f"cluedo_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} summary")
+                    typed.add(metric)
+                for q in QUANTILES:
+                    lines.append(
+                        f"{metric}{render_labels(labels, f'quantile="{q}"')} {series.quantile(q)}"
+                    )
+                lines.append(f"{metric}_sum{render_labels(labels)} {series.total}")
+                lines.append(f"{metric}_count{render_labels(labels)} {series.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"cluedo_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                lines.append(f"{metric}{render_labels(labels)} {value}")
+        lines.append("# TYPE cluedo_games_per_minute gauge")
+        lines.append(f"cluedo_games_per_minute {self.games_per_minute()}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str | Path):
+        Path(path).write_text(self.to_prometheus())
+
+    def serve(self, port: int = 9464) -> ThreadingHTTPServer:
+        """Serve the metrics on http://127.0.0.1:port/metrics from a background thread"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass  # no access log in the middle of the game output
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+def timed_tool(function: Callable) -> Callable:
+    """Record the execution time of a tool in the registry of the running game, if any"""
+
+    def record(started: float):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.observe(
+                "tool_seconds", time.perf_counter() - started, tool=function.__name__
+            )
+
+    if inspect.iscoroutinefunction(function):
+
+        @functools.wraps(function)
+        async def timed_async(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await function(*args, **kwargs)
+            finally:
+                record(started)
+
+        return timed_async
+
+    @functools.wraps(function)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            record(started)
+
+    return timed
+
+
+class MeasuredModel(WrapperModel):
+    """Model of one agent that records its requests. busy: seconds spent in requests (per game)"""
+
+    def __init__(self, wrapped: Model | str, agent: str, metrics: MetricsRegistry):
+        super().__init__(wrapped)
+        self.agent = agent
+        self.metrics = metrics
+        self.busy = 0.0
+
+    def _record(self, elapsed: float, input_tokens: int, output_tokens: int):
+        self.busy += elapsed
+        self.metrics.observe("model_request_seconds", elapsed, agent=self.agent)
+        self.metrics.inc("model_requests_total", agent=self.agent)
+        self.metrics.inc("model_input_tokens_total", input_tokens, agent=self.agent)
+        self.metrics.inc("model_output_tokens_total", output_tokens, agent=self.agent)
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        started = time.perf_counter()
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        elapsed = time.perf_counter() - started
+        self._record(elapsed, response.usage.input_tokens, response.usage.output_tokens)
+        if elapsed > 0:
+            self.metrics.observe(
+                "model_decode_tokens_per_second",
+                response.usage.output_tokens / elapsed,
+                agent=self.agent,
+            )
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context=None,
+    ) -> AsyncIterator[StreamedResponse]:
+        started = time.perf_counter()
+        async with super().request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            # the stream is returned once its first chunk arrived
+            ttft = time.perf_counter() - started
+            self.metrics.observe("model_ttft_seconds", ttft, agent=self.agent)
+            yield stream
+        elapsed = time.perf_counter() - started
+        usage = stream.usage()
+        self._record(elapsed, usage.input_tokens, usage.output_tokens)
+        if ttft > 0:
+            self.metrics.observe(
+                "model_prefill_tokens_per_second",
+                usage.input_tokens / ttft,
+                agent=self.agent,
+            )
+        if elapsed > ttft:
+            self.metrics.observe(
+                "model_decode_tokens_per_second",
+                usage.output_tokens / (elapsed - ttft),
+                agent=self.agent,
+            )
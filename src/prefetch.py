@@ -0,0 +1,110 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+
+from pydantic_ai.usage import RunUsage
+
+from src.game_engine import CluedoGameEngine
+from src.tool_calls import parse_instruction, tool_call_key
+
+"""
+Speculative research while the supervisor thinks.
+The supervisor follows its checklist (suspects, weapons, rooms, then clues), so its next request is easy to guess.
+Before each supervisor call the next `depth` unexplored calls of the checklist are started in the background:
+- with the direct dispatch they are plain tool calls (no tokens)
+- with research=True they are researcher runs (tokens, wasted when the guess is wrong)
+When the decision arrives, a matching speculation is used as the research result. The others keep running
+while they are still among the next guesses, else they are cancelled (wasted).
+Each speculation gets its own RunUsage, filled as its requests complete, so a cancelled run still reports
+the tokens it spent: wasted_usage is added to the totals of the game.
+"""
+
+CHECKLIST = [
+    "Use get_suspect_names to get all suspect names",
+    "Use get_weapons_names to get all weapon names",
+    "Use get_room_names to get all room names",
+    *(f"Use get_crime_scene_details for the {room}" for room in CluedoGameEngine.ROOMS),
+    *(
+        f"Use get_witness_statement for {suspect}"
+        for suspect in CluedoGameEngine.SUSPECTS
+    ),
+]
+
+
+class Prefetcher:
+    def __init__(
+        self,
+        tools: dict[str, list[str]],
+        depth: int = 2,
+        research: bool = False,
+    ):
+        self.tools = tools  # research tool -> arguments
+        self.depth = depth
+        self.research = research
+        self.checklist = [
+            (tool_call_key(*parse_instruction(step, tools)[:2]), step)
+            for step in CHECKLIST
+        ]
+        self.running: dict[str, tuple[asyncio.Task, RunUsage]] = {}
+        self.started = 0
+        self.hits = 0
+        self.wasted_runs = 0
+        self.wasted_usage = RunUsage()
+
+    def start(
+        self,
+        done: set[str],
+        run: Callable[[str, RunUsage], Awaitable],
+        direct: bool,
+    ):
+        """Speculate on the next calls of the checklist that are not in `done`, drop the outdated guesses.
+        run(instruction, usage) computes a research result, its tokens in `usage`; direct: run() calls the
+        tool without a model"""
+        if not direct and not self.research:
+            return  # nothing cheap to speculate on
+        predicted = [
+            (key, instruction) for key, instruction in self.checklist if key not in done
+        ][: self.depth]
+        keys = {key for key, _ in predicted}
+        for key in [key for key in self.running if key not in keys]:
+            self._drop(*self.running.pop(key))
+        for key, instruction in predicted:
+            if key not in self.running:
+                spent = RunUsage()
+                self.running[key] = (
+                    asyncio.create_task(run(instruction, spent)),
+                    spent,
+                )
+                self.started += 1
+
+    def take(self, key: str | None) -> asyncio.Task | None:
+        """Speculation of this call, if one was started"""
+        speculation = self.running.pop(key, None) if key else None
+        if speculation is None:
+            return None
+        self.hits += 1
+        return speculation[0]
+
+    def _drop(self, task: asyncio.Task, spent: RunUsage):
+        # a cancelled run stops before its next request completes, `spent` has its tokens so far
+        task.cancel()
+        self.wasted_usage += spent
+        self.wasted_runs += 1
+
+    async def discard(self):
+        """Drop every speculation (end of the game)"""
+        speculations = list(self.running.values())
+        for task, spent in speculations:
+            self._drop(task, spent)
+        await asyncio.gather(
+            *(task for task, _ in speculations), return_exceptions=True
+        )
+        self.running = {}
+
+    def report(self) -> dict:
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.started, 3) if self.started else 0.0,
+            "wasted_runs": self.wasted_runs,
+            "wasted_tokens": self.wasted_usage.total_tokens,
+        }
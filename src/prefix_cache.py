@@ -0,0 +1,86 @@
+import os
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    SystemPromptPart,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+
+from src.tokens import estimate_tokens
+
+"""
+Token accounting of the prompt prefix shared between two consecutive requests of the same agent.
+LM Studio / llama.cpp / MLX servers keep the KV cache of the last prompt: whatever the new prompt shares
+with it from the start doesn't need to be prefilled again.
+The tool schemas of an agent don't change between turns, they are not part of the comparison.
+"""
+
+
+def render_prompt(messages: list[ModelMessage]) -> str:
+    """Text of the messages in the order the server sees them"""
+    lines = []
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, SystemPromptPart):
+                lines.append(f"system: {part.content}")
+            elif isinstance(part, UserPromptPart):
+                lines.append(f"user: {part.content}")
+            elif isinstance(part, ToolReturnPart):
+                lines.append(f"tool {part.tool_name}: {part.model_response_str()}")
+            elif isinstance(part, ToolCallPart):
+                lines.append(f"call {part.tool_name}: {part.args_as_json_str()}")
+            elif isinstance(part, TextPart):
+                lines.append(f"assistant: {part.content}")
+    return "\n".join(lines)
+
+
+def first_request(
+    messages: list[ModelMessage], history_length: int
+) -> list[ModelMessage]:
+    """Messages sent with the first request of a run: the history and the new request"""
+    return messages[: history_length + 1]
+
+
+class PrefixTracker:
+    def __init__(self):
+        self.previous: dict[str, str] = {}  # agent -> last prompt
+        self.turns: list[dict] = []
+
+    def record(
+        self,
+        agent: str,
+        turn: int,
+        messages: list[ModelMessage],
+        history_length: int = 0,
+    ) -> dict:
+        """Compare the prompt of this run with the previous prompt of the agent"""
+        prompt = render_prompt(first_request(messages, history_length))
+        shared = os.path.commonprefix([self.previous.get(agent, ""), prompt])
+        # the next run starts from everything this one produced
+        self.previous[agent] = render_prompt(messages)
+
+        entry = {
+            "agent": agent,
+            "turn": turn,
+            "prompt_tokens": estimate_tokens(prompt),
+            "shared_tokens": estimate_tokens(shared),
+        }
+        self.turns.append(entry)
+        return entry
+
+    def report(self) -> dict:
+        per_agent = {}
+        for entry in self.turns:
+            totals = per_agent.setdefault(
+                entry["agent"], {"prompt_tokens": 0, "shared_tokens": 0}
+            )
+            totals["prompt_tokens"] += entry["prompt_tokens"]
+            totals["shared_tokens"] += entry["shared_tokens"]
+        for totals in per_agent.values():
+            totals["shared_ratio"] = round(
+                totals["shared_tokens"] / max(totals["prompt_tokens"], 1), 3
+            )
+        return {"per_agent": per_agent, "turns": self.turns}
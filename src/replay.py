@@ -0,0 +1,320 @@
+import asyncio
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import polars as pl
+from pydantic_ai.exceptions import AgentRunError
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    UserPromptPart,
+)
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from src.response_cache import ReplayedStream
+from src.telemetry import TELEMETRY_MODES, configure_telemetry
+from src.traces import TraceWriter, read_traces
+
+"""
+Replay of a recorded game: the model responses of a trace are fed back in, without a model server,
+while the tools and the orchestration run for real. A change of src/tools.py or of the loop can then be
+checked for its behaviour (same outcome, no missing response) and its CPU cost per turn.
+- record: run_investigation(..., tracer=tracer, record_responses=True) adds a model_response event per request
+- replay: backend=ReplayBackend(traces_dir, run_id), with the same seed and options as the recorded game
+time_scale: 0 answers at once, 1 waits the recorded latencies, 0.1 waits a tenth of them. Several games can
+replay the same recording at once, to reproduce a slow run under load:
+
+    python -m src.replay traces/ --run-id 3f2a... --games 50 --time-scale 1
+"""
+
+# researchers of the same turn can run in parallel (fan-out, prefetch): their responses are
+# matched by task, the other agents' by order
+KEYED_BY_PROMPT = {"researcher"}
+
+
+class ReplayError(Exception):
+    """The game asked for a response that wasn't recorded: its behaviour changed"""
+
+
+def stream_key(agent: str, messages: list[ModelMessage]) -> str:
+    if agent not in KEYED_BY_PROMPT:
+        return agent
+    prompts = [
+        part.content
+        for message in messages
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, UserPromptPart) and isinstance(part.content, str)
+    ]
+    return f"{agent}:{prompts[-1] if prompts else ''}"
+
+
+class RecordingModel(WrapperModel):
+    """Writes every response of the wrapped model to the traces"""
+
+    def __init__(
+        self,
+        wrapped: Model,
+        agent: str,
+        tracer: TraceWriter,
+        run_id: str,
+        seed: int | None,
+    ):
+        super().__init__(wrapped)
+        self.agent = agent
+        self.tracer = tracer
+        self.run_id = run_id
+        self.seed = seed
+
+    def _record(self, key: str, response: ModelResponse, latency: float):
+        self.tracer.write(
+            {
+                "run_id": self.run_id,
+                "seed": self.seed,
+                "event": "model_response",
+                "timestamp": time.time(),
+                "agent": self.agent,
+                "stream": key,
+                "response": ModelMessagesTypeAdapter.dump_json([response]).decode(),
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+                "latency_s": latency,
+            }
+        )
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        started = time.perf_counter()
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        self._record(
+            stream_key(self.agent, messages), response, time.perf_counter() - started
+        )
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context=None,
+    ) -> AsyncIterator[StreamedResponse]:
+        started = time.perf_counter()
+        async with super().request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        self._record(
+            stream_key(self.agent, messages),
+            stream.get(),
+            time.perf_counter() - started,
+        )
+
+
+class ReplayModel(Model):
+    def __init__(
+        self,
+        agent: str,
+        responses: dict[str, deque[tuple[ModelResponse, float]]],
+        time_scale: float,
+    ):
+        super().__init__()
+        self.agent = agent
+        self.responses = responses
+        self.time_scale = time_scale
+
+    async def _next(self, messages: list[ModelMessage]) -> ModelResponse:
+        key = stream_key(self.agent, messages)
+        if not self.responses.get(key):
+            raise ReplayError(f"no recorded response left for {key[:80]}")
+        response, latency = self.responses[key].popleft()
+        if self.time_scale:
+            await asyncio.sleep(latency * self.time_scale)
+        return response
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        return await self._next(messages)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context=None,
+    ) -> AsyncIterator[StreamedResponse]:
+        response = await self._next(messages)
+        yield ReplayedStream(model_request_parameters, response=response)
+
+    @property
+    def model_name(self) -> str:
+        return f"replay-{self.agent}"
+
+    @property
+    def system(self) -> str:
+        return "replay"
+
+
+class ReplayBackend:
+    """Model responses of one recorded game, played back by every game using this backend"""
+
+    def __init__(
+        self, traces_dir: str | Path, run_id: str | None = None, time_scale: float = 0.0
+    ):
+        traces = read_traces(traces_dir)
+        recorded = traces.filter(pl.col("event") == "model_response")
+        if run_id is None:
+            # the last recorded game
+            run_id = (
+                recorded.sort("timestamp")
+                .select(pl.col("run_id").last())
+                .collect()
+                .item()
+            )
+            if run_id is None:
+                raise ReplayError(f"no model responses recorded in {traces_dir}")
+        self.run_id = run_id
+        self.time_scale = time_scale
+        rows = (
+            recorded.filter(pl.col("run_id") == run_id)
+            .sort("timestamp", maintain_order=True)
+            .select("agent", "stream", "response", "latency_s")
+            .collect()
+        )
+        self.recording = [
+            (
+                row["agent"],
+                row["stream"],
+                ModelMessagesTypeAdapter.validate_json(row["response"])[0],
+                row["latency_s"] or 0.0,
+            )
+            for row in rows.iter_rows(named=True)
+        ]
+        outcome = (
+            traces.filter((pl.col("run_id") == run_id) & (pl.col("event") == "outcome"))
+            .select("seed", "turn", "solution", "submitted")
+            .collect()
+        )
+        self.outcome = outcome.row(0, named=True) if len(outcome) else None
+        self.seed = self.outcome["seed"] if self.outcome else None
+
+    def models(self, seed: int | None = None) -> dict[str, Model]:
+        """Fresh replay models for one game"""
+        responses: dict[str, deque[tuple[ModelResponse, float]]] = {}
+        for _, key, response, latency in self.recording:
+            responses.setdefault(key, deque()).append((response, latency))
+        agents = {agent for agent, *_ in self.recording}
+        return {
+            agent: ReplayModel(agent, responses, self.time_scale) for agent in agents
+        }
+
+
+async def replay(
+    backend: ReplayBackend, games: int = 1, concurrency: int = 1, **run_options
+) -> pl.DataFrame:
+    """Play the recording `games` times, one row per game with its outcome and CPU cost"""
+    from main import USER_QUERY, run_investigation
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def play(game_id: int) -> dict:
+        async with semaphore:
+            try:
+                result = await run_investigation(
+                    USER_QUERY,
+                    seed=backend.seed,
+                    backend=backend,
+                    verbose=False,
+                    **run_options,
+                )
+            except (ReplayError, AgentRunError) as e:
+                # a game that diverged from the recording (no recorded response left, a recorded call
+                # the game rejects) is a result too
+                return {"game_id": game_id, "error": f"{type(e).__name__}: {e}"}
+            return {
+                "game_id": game_id,
+                "turns": result["attempts_used"],
+                "solution": result["solution"],
+                "submitted": result["submitted"],
+                "wall_time": result["wall_time"],
+                "error": None,
+            }
+
+    cpu_started = time.process_time()
+    rows = await asyncio.gather(*(play(i) for i in range(games)))
+    cpu = time.process_time() - cpu_started
+    results = pl.DataFrame(
+        rows,
+        schema={
+            "game_id": pl.Int64,
+            "turns": pl.Int64,
+            "solution": pl.String,
+            "submitted": pl.Boolean,
+            "wall_time": pl.Float64,
+            "error": pl.String,
+        },
+    )
+    expected = backend.outcome or {}
+    return results.with_columns(
+        same_outcome=(pl.col("turns") == expected.get("turn"))
+        & (pl.col("solution") == expected.get("solution")),
+        cpu_ms_per_turn=pl.lit(cpu * 1000) / pl.col("turns").sum(),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded game")
+    parser.add_argument("traces", help="directory of the trace files")
+    parser.add_argument("--run-id", help="recorded game, the last one by default")
+    parser.add_argument("--games", type=int, default=1, help="replays of the game")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=0.0,
+        help="share of the recorded latencies to wait (0: none, 1: original)",
+    )
+    # the options the game was recorded with
+    parser.add_argument("--conversation", action="store_true")
+    parser.add_argument("--direct-dispatch", action="store_true")
+    parser.add_argument("--fan-out", type=int, default=1)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--telemetry", choices=TELEMETRY_MODES, default="off")
+    args = parser.parse_args()
+    configure_telemetry(args.telemetry)
+
+    backend = ReplayBackend(args.traces, args.run_id, args.time_scale)
+    print(f"Replaying {backend.run_id} (seed {backend.seed}): {backend.outcome}")
+    results = asyncio.run(
+        replay(
+            backend,
+            args.games,
+            args.concurrency,
+            conversation=args.conversation,
+            direct_dispatch=args.direct_dispatch,
+            fan_out=args.fan_out,
+            stream=args.stream,
+        )
+    )
+    with pl.Config(tbl_cols=-1, tbl_rows=-1, fmt_str_lengths=80):
+        print(results)
@@ -0,0 +1,57 @@
+from pydantic import BaseModel, ConfigDict
+from pydantic_ai.messages import ModelMessage
+
+from src.tool_calls import parse_instruction, tool_call_key, tool_call_keys
+
+"""
+Results of the researcher by normalized tool call.
+When the supervisor asks again for a call the researcher already made, the stored answer is reused and
+the researcher (2 model requests, ~2,600 tokens) is not called.
+A result is only stored when the researcher made exactly the call predicted from the instruction.
+The tool outputs only depend on the scenario: games with the same seed can share one cache.
+"""
+
+
+class CachedResearch(BaseModel):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    output: str
+    messages: list[ModelMessage]  # new messages of the researcher run
+    tokens: int  # tokens the researcher used
+
+
+class ResearchCache:
+    def __init__(self, tools: dict[str, list[str]]):
+        self.tools = tools  # research tool -> arguments
+        self.entries: dict[tuple[str, str], CachedResearch] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, instruction: str) -> str | None:
+        """Normalized call the instruction asks for, None if it can't be predicted"""
+        parsed = parse_instruction(instruction, self.tools)
+        if parsed.problem is not None:
+            return None
+        return tool_call_key(parsed.tool_name, parsed.args)
+
+    def get(self, scope: str, key: str | None) -> CachedResearch | None:
+        """scope: the game's seed to share results between games, else an id of the game"""
+        entry = self.entries.get((scope, key)) if key else None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(
+        self,
+        scope: str,
+        key: str | None,
+        output: str,
+        messages: list[ModelMessage],
+        tokens: int,
+    ):
+        if key and tool_call_keys(messages) == [key]:
+            self.entries[(scope, key)] = CachedResearch(
+                output=output, messages=messages, tokens=tokens
+            )
@@ -0,0 +1,253 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Literal
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelResponse,
+    ModelResponseStreamEvent,
+)
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+from pydantic_ai.usage import RequestUsage
+from pydantic_core import to_jsonable_python
+
+"""
+Model responses on disk (SQLite), by a hash of the request: model name, messages, tools and settings.
+Timestamps, ids and usage are left out of the hash, so the same game replays the same requests.
+- record: answer from the cache, else call the model and store its response
+- replay: answer from the cache only, a miss fails the request (ResponseCacheMiss)
+- passthrough: always call the model, the cache is not used
+The least recently used responses are evicted above max_bytes.
+A cached response comes back with an empty usage (no tokens were spent), the tokens it saved are in the report.
+The database is read and written in a thread, off the event loop of the games.
+The scripted models (src/scripted_models.py) keep a state per game: a cached answer skips their turn, so
+only replay whole games with them.
+
+    cache = ResponseCache("responses.sqlite", mode="record")
+    result = await run_investigation(USER_QUERY, seed=1, response_cache=cache)
+"""
+
+CacheMode = Literal["record", "replay", "passthrough"]
+
+# parts of the messages that change between runs of the same game
+VOLATILE_KEYS = {
+    "timestamp",
+    "tool_call_id",
+    "run_id",
+    "usage",
+    "provider_response_id",
+    "provider_details",
+    "provider_name",
+    "provider_url",
+    "finish_reason",
+}
+
+
+class ResponseCacheMiss(Exception):
+    pass
+
+
+def stable(value):
+    """value without its volatile keys"""
+    if isinstance(value, dict):
+        return {k: stable(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [stable(v) for v in value]
+    return value
+
+
+def request_key(
+    model_name: str,
+    messages: list[ModelMessage],
+    model_settings: ModelSettings | None,
+    model_request_parameters: ModelRequestParameters,
+) -> str:
+    request = {
+        "model": model_name,
+        "messages": stable(ModelMessagesTypeAdapter.dump_python(messages, mode="json")),
+        "settings": to_jsonable_python(model_settings or {}),
+        "parameters": stable(to_jsonable_python(model_request_parameters)),
+    }
+    return hashlib.sha256(
+        json.dumps(request, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        path: str | Path,
+        mode: CacheMode = "record",
+        max_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.mode = mode
+        self.max_bytes = max_bytes
+        # used from the threads of asyncio.to_thread, one at a time
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.db.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, model TEXT, response BLOB, size INTEGER, last_used REAL
+            )"""
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)"
+        )
+        self.size = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.tokens_saved = 0
+
+    def get(self, key: str) -> ModelResponse | None:
+        """The cached response, its usage zeroed (the tokens are counted as saved)"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.db.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+            self.db.commit()
+            response = ModelMessagesTypeAdapter.validate_json(row[0])[0]
+            self.tokens_saved += response.usage.total_tokens
+        return dataclasses.replace(response, usage=RequestUsage())
+
+    def put(self, key: str, model_name: str, response: ModelResponse):
+        data = ModelMessagesTypeAdapter.dump_json([response])
+        with self.lock:
+            old = self.db.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, data, len(data), time.time()),
+            )
+            self.size += len(data) - (old[0] if old else 0)
+            self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        while self.size > self.max_bytes:
+            row = self.db.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (row[0],))
+            self.size -= row[1]
+            self.evicted += 1
+
+    def wrap(self, model: Model) -> Model:
+        return model if self.mode == "passthrough" else CachedModel(model, self)
+
+    def close(self):
+        self.db.close()
+
+    def report(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "evicted": self.evicted,
+            "size_bytes": self.size,
+        }
+
+
+@dataclass
+class ReplayedStream(StreamedResponse):
+    """A cached response played back as a stream, one event per part"""
+
+    response: ModelResponse = field(kw_only=True)
+
+    async def _get_event_iterator(self) -> AsyncIterator[ModelResponseStreamEvent]:
+        self._usage = self.response.usage
+        for index, part in enumerate(self.response.parts):
+            yield self._parts_manager.handle_part(vendor_part_id=index, part=part)
+
+    @property
+    def model_name(self) -> str:
+        return self.response.model_name or ""
+
+    @property
+    def provider_name(self) -> str | None:
+        return self.response.provider_name
+
+    @property
+    def provider_url(self) -> str | None:
+        return None
+
+    @property
+    def timestamp(self) -> datetime:
+        return self.response.timestamp
+
+
+class CachedModel(WrapperModel):
+    def __init__(self, wrapped: Model, cache: ResponseCache):
+        super().__init__(wrapped)
+        self.cache = cache
+
+    async def _lookup(self, key: str) -> ModelResponse | None:
+        response = await asyncio.to_thread(self.cache.get, key)
+        if response is None and self.cache.mode == "replay":
+            raise ResponseCacheMiss(f"no cached response for {self.model_name}")
+        return response
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        key = request_key(
+            self.model_name, messages, model_settings, model_request_parameters
+        )
+        if cached := await self._lookup(key):
+            return cached
+        response = await super().request(
+            messages, model_settings, model_request_parameters
+        )
+        await asyncio.to_thread(self.cache.put, key, self.model_name, response)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context=None,
+    ) -> AsyncIterator[StreamedResponse]:
+        key = request_key(
+            self.model_name, messages, model_settings, model_request_parameters
+        )
+        if cached := await self._lookup(key):
+            yield ReplayedStream(model_request_parameters, response=cached)
+            return
+        async with super().request_stream(
+            messages, model_settings, model_request_parameters, run_context
+        ) as stream:
+            yield stream
+        await asyncio.to_thread(self.cache.put, key, self.model_name, stream.get())
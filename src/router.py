@@ -0,0 +1,257 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack, asynccontextmanager
+
+import httpx
+from openai import AsyncOpenAI
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, StreamedResponse
+from pydantic_ai.models.openai import OpenAIChatModel
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.providers.openai import OpenAIProvider
+from pydantic_ai.settings import ModelSettings
+
+from src.http_pool import http_client
+
+"""
+Several OpenAI compatible servers (LM Studio on several machines or ports) behind the agents' models.
+Each request goes to the healthy endpoint with the fewest requests in flight, at most max_concurrency per
+endpoint (the others wait for a free slot). An endpoint failing max_failures times in a row (connection
+error, 5xx, 429) is ejected for eject_seconds, the request is retried on another one. Health checks
+(GET /models, health_timeout seconds) bring an ejected endpoint back as soon as it answers.
+The router is used like a backend: router.models() replaces the models of the 3 agents.
+
+    router = ModelRouter(["http://127.0.0.1:1234/v1", "http://127.0.0.1:1235/v1"], max_concurrency=4)
+    result = await run_investigation(USER_QUERY, seed=1, backend=router)
+
+`python -m src.stub_server --ports 1235 1236` starts stand-in servers to try it without models.
+"""
+
+
+def endpoint_failed(error: Exception) -> bool:
+    """The endpoint is at fault (else it's the request, e.g. a 400)"""
+    if isinstance(error, ModelHTTPError):
+        return error.status_code >= 500 or error.status_code == 429
+    return isinstance(error, ModelAPIError | httpx.HTTPError)
+
+
+class Endpoint:
+    def __init__(self, base_url: str, max_concurrency: int):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        # no retries in the openai client: the router retries on another endpoint
+        self.provider = OpenAIProvider(
+            openai_client=AsyncOpenAI(
+                base_url=self.base_url,
+                api_key="lm-studio",
+                http_client=http_client,
+                max_retries=0,
+            )
+        )
+        self.models: dict[str, OpenAIChatModel] = {}
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0  # in a row
+        self.errors = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def model(self, model_name: str) -> OpenAIChatModel:
+        if model_name not in self.models:
+            self.models[model_name] = OpenAIChatModel(
+                model_name, provider=self.provider
+            )
+        return self.models[model_name]
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.ejected_until
+
+    def report(self) -> dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "healthy": self.healthy,
+        }
+
+
+class ModelRouter:
+    def __init__(
+        self,
+        base_urls: list[str],
+        max_concurrency: int = 4,
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        health_interval: float = 5.0,
+        health_timeout: float = 2.0,
+    ):
+        self.endpoints = [Endpoint(url, max_concurrency) for url in base_urls]
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._freed = asyncio.Condition()
+        self._health_task: asyncio.Task | None = None
+
+    def models(self, seed: int | None = None) -> dict[str, Model]:
+        """Routed models of the 3 agents, same model names as src/agents.py"""
+        from src.agents import AGENTS  # agents.py imports the http pool, not the router
+
+        return {
+            name: RoutedModel(self, agent.model.model_name)
+            for name, agent in AGENTS.items()
+        }
+
+    async def acquire(self, exclude: set[Endpoint]) -> Endpoint:
+        """Least outstanding endpoint with a free slot, waits if they are all busy"""
+        async with self._freed:
+            while True:
+                candidates = [e for e in self.endpoints if e not in exclude]
+                # every endpoint ejected: keep trying them rather than failing the game
+                candidates = [e for e in candidates if e.healthy] or candidates
+                if not candidates:
+                    raise ModelAPIError("router", "every endpoint failed")
+                free = [e for e in candidates if e.outstanding < e.max_concurrency]
+                if free:
+                    endpoint = min(free, key=lambda e: (e.outstanding, e.requests))
+                    endpoint.outstanding += 1
+                    endpoint.requests += 1
+                    return endpoint
+                await self._freed.wait()
+
+    async def release(self, endpoint: Endpoint, error: Exception | None = None):
+        if error is None:
+            endpoint.failures = 0
+        elif endpoint_failed(error):
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                self.eject(endpoint)
+        async with self._freed:
+            endpoint.outstanding -= 1
+            self._freed.notify_all()
+
+    def eject(self, endpoint: Endpoint):
+        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+        endpoint.ejections += 1
+        endpoint.failures = 0
+
+    async def check(self, endpoint: Endpoint) -> bool:
+        """Health check, brings an ejected endpoint back when it answers"""
+        try:
+            # a short timeout of its own, not the pool's read timeout of a long generation
+            response = await http_client.get(
+                f"{endpoint.base_url}/models",
+                timeout=self.health_timeout,
+                extensions={"own_timeout": True},
+            )
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            endpoint.ejected_until = 0.0
+        elif endpoint.healthy:
+            self.eject(endpoint)
+        return ok
+
+    async def check_all(self) -> dict[str, bool]:
+        results = await asyncio.gather(*(self.check(e) for e in self.endpoints))
+        return {e.base_url: ok for e, ok in zip(self.endpoints, results, strict=True)}
+
+    def start_health_checks(self):
+        """Check every endpoint each health_interval seconds in the background"""
+
+        async def loop():
+            while True:
+                await self.check_all()
+                await asyncio.sleep(self.health_interval)
+
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(loop())
+
+    async def stop_health_checks(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    def report(self) -> dict:
+        return {e.base_url: e.report() for e in self.endpoints}
+
+
+class RoutedModel(WrapperModel):
+    """One model name served by every endpoint of the router.
+    The first endpoint's model gives the profile and settings, all endpoints serve the same model"""
+
+    def __init__(self, router: ModelRouter, model_name: str):
+        super().__init__(router.endpoints[0].model(model_name))
+        self.router = router
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        tried: set[Endpoint] = set()
+        while True:
+            endpoint = await self.router.acquire(tried)
+            error = None
+            try:
+                return await endpoint.model(self.model_name).request(
+                    messages, model_settings, model_request_parameters
+                )
+            except Exception as e:
+                error = e
+                tried.add(endpoint)
+                if not endpoint_failed(e) or len(tried) == len(self.router.endpoints):
+                    raise
+            finally:
+                # also when the request is cancelled (CancelledError is not an Exception)
+                await self.router.release(endpoint, error)
+
+    @asynccontextmanager
+    async def request_stream(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        run_context=None,
+    ) -> AsyncIterator[StreamedResponse]:
+        # a stream can only be retried before it started
+        tried: set[Endpoint] = set()
+        while True:
+            endpoint = await self.router.acquire(tried)
+            stack = AsyncExitStack()
+            started, error = False, None
+            try:
+                response = await stack.enter_async_context(
+                    endpoint.model(self.model_name).request_stream(
+                        messages, model_settings, model_request_parameters, run_context
+                    )
+                )
+                started = True
+            except Exception as e:
+                error = e
+                tried.add(endpoint)
+                if not endpoint_failed(e) or len(tried) == len(self.router.endpoints):
+                    raise
+            finally:
+                # a started stream is released once closed, below
+                if not started:
+                    await self.router.release(endpoint, error)
+            if started:
+                break
+
+        error = None
+        try:
+            async with stack:
+                yield response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            await self.router.release(endpoint, error)
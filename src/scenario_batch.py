@@ -0,0 +1,176 @@
+from collections.abc import Iterator
+
+import numpy as np
+
+from src.game_engine import CluedoGameEngine, GameScenario
+
+"""
+Bulk scenario generation for benchmark sweeps (10^5 - 10^6 scenarios).
+
+All the random draws of N scenarios are done at once with numpy and stored as small integer arrays
+indexing into CluedoGameEngine.ROOMS/WEAPONS/SUSPECTS and the other lists of the engine.
+A scenario takes ~30 bytes this way, the full GameScenario (pydantic models + strings) is only built on demand.
+
+The draws follow the same distributions as CluedoGameEngine.generate_scenario, but not the same random stream:
+ScenarioBatch.generate(n, seed=42)[0] is not the scenario of CluedoGameEngine(seed=42).
+"""
+
+N_ROOMS = len(CluedoGameEngine.ROOMS)
+N_SUSPECTS = len(CluedoGameEngine.SUSPECTS)
+N_WEAPONS = len(CluedoGameEngine.WEAPONS)
+N_HERRINGS = 5  # size of CluedoGameEngine._red_herrings_pool
+NO_TESTIMONY = -1
+
+
+class ScenarioBatch:
+    """N scenarios stored column-wise as integer index arrays"""
+
+    def __init__(
+        self,
+        murderer: np.ndarray,  # (n,) -> SUSPECTS
+        weapon: np.ndarray,  # (n,) -> WEAPONS
+        room: np.ndarray,  # (n,) -> ROOMS
+        murder_time: np.ndarray,  # (n,) -> MURDER_TIMES
+        evidence_mask: np.ndarray,  # (n, rooms) bool, always True for the murder room
+        evidence_item: np.ndarray,  # (n, rooms) -> SCENE_ITEMS, ignored in the murder room
+        alibi: np.ndarray,  # (n, suspects) -> ALIBI_LOCATIONS
+        testimony: np.ndarray,  # (n, suspects) -> TESTIMONIES or NO_TESTIMONY
+        decoys: np.ndarray,  # (n, 3) -> WEAPONS, SUSPECTS, ROOMS, never the solution
+        herrings: np.ndarray,  # (n, 3) -> the 5 red herrings of the pool, in order
+    ):
+        self.murderer = murderer
+        self.weapon = weapon
+        self.room = room
+        self.murder_time = murder_time
+        self.evidence_mask = evidence_mask
+        self.evidence_item = evidence_item
+        self.alibi = alibi
+        self.testimony = testimony
+        self.decoys = decoys
+        self.herrings = herrings
+
+    @classmethod
+    def generate(cls, n: int, seed: int | None = None) -> "ScenarioBatch":
+        """Draw n scenarios at once"""
+        rng = np.random.default_rng(seed)
+        engine = CluedoGameEngine
+        rows = np.arange(n)
+
+        murderer = rng.integers(0, N_SUSPECTS, n, dtype=np.int8)
+        weapon = rng.integers(0, N_WEAPONS, n, dtype=np.int8)
+        room = rng.integers(0, N_ROOMS, n, dtype=np.int8)
+        murder_time = rng.integers(0, len(engine.MURDER_TIMES), n, dtype=np.int8)
+
+        # Some rooms have evidence, some don't. The murder room always has the weapon
+        evidence_mask = rng.random((n, N_ROOMS), dtype=np.float32) < 0.6
+        evidence_mask[rows, room] = True
+        evidence_item = rng.integers(
+            0, len(engine.SCENE_ITEMS), (n, N_ROOMS), dtype=np.int8
+        )
+
+        alibi = rng.integers(
+            0, len(engine.ALIBI_LOCATIONS), (n, N_SUSPECTS), dtype=np.int8
+        )
+        # Half of the innocent witnesses saw/heard something useful
+        saw_something = rng.random((n, N_SUSPECTS), dtype=np.float32) < 0.5
+        testimony = np.where(
+            saw_something,
+            rng.integers(0, len(engine.TESTIMONIES), (n, N_SUSPECTS), dtype=np.int8),
+            np.int8(NO_TESTIMONY),
+        )
+        testimony[rows, murderer] = NO_TESTIMONY
+
+        # Uniform draw among the 5 other cards: draw in [0, 5) and skip the solution
+        decoys = np.empty((n, 3), dtype=np.int8)
+        for column, (truth, size) in enumerate(
+            [(weapon, N_WEAPONS), (murderer, N_SUSPECTS), (room, N_ROOMS)]
+        ):
+            draw = rng.integers(0, size - 1, n, dtype=np.int8)
+            decoys[:, column] = draw + (draw >= truth)
+
+        # 3 red herrings out of 5 without replacement, keeping the draw order
+        herrings = np.argsort(rng.random((n, N_HERRINGS), dtype=np.float32), axis=1)
+        herrings = herrings[:, :3].astype(np.int8)
+
+        return cls(
+            murderer,
+            weapon,
+            room,
+            murder_time,
+            evidence_mask,
+            evidence_item,
+            alibi,
+            testimony,
+            decoys,
+            herrings,
+        )
+
+    def __len__(self) -> int:
+        return len(self.murderer)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in vars(self).values())
+
+    def solutions(self) -> np.ndarray:
+        """(n, 3) array of (murderer, weapon, room) indexes"""
+        return np.stack([self.murderer, self.weapon, self.room], axis=1)
+
+    def scenario(self, i: int) -> GameScenario:
+        """Build the full GameScenario of row i"""
+        engine = CluedoGameEngine
+        murderer = engine.SUSPECTS[self.murderer[i]]
+        weapon = engine.WEAPONS[self.weapon[i]]
+        location = engine.ROOMS[self.room[i]]
+        murder_time = engine.MURDER_TIMES[self.murder_time[i]]
+
+        # same key order as generate_scenario: murder room first
+        crime_scene_evidence = {
+            location: engine._murder_scene_evidence(location, weapon)
+        }
+        for r, room in enumerate(engine.ROOMS):
+            if room != location and self.evidence_mask[i, r]:
+                item = engine.SCENE_ITEMS[self.evidence_item[i, r]]
+                crime_scene_evidence[room] = engine._room_evidence(room, item)
+
+        witness_statements = {}
+        for s, suspect in enumerate(engine.SUSPECTS):
+            alibi_location = engine.ALIBI_LOCATIONS[self.alibi[i, s]]
+            if suspect == murderer:
+                witness_statements[suspect] = engine._murderer_statement(
+                    suspect, alibi_location, murder_time
+                )
+            else:
+                t = self.testimony[i, s]
+                testimony = (
+                    engine.NO_TESTIMONY
+                    if t == NO_TESTIMONY
+                    else engine.TESTIMONIES[t].format(room=location, time=murder_time)
+                )
+                witness_statements[suspect] = engine._witness_statement(
+                    suspect, alibi_location, murder_time, testimony
+                )
+
+        decoy_weapon, decoy_suspect, decoy_room = self.decoys[i]
+        pool = engine._red_herrings_pool(
+            engine.WEAPONS[decoy_weapon],
+            engine.SUSPECTS[decoy_suspect],
+            engine.ROOMS[decoy_room],
+        )
+
+        return GameScenario(
+            murderer=murderer,
+            murder_weapon=weapon,
+            murder_location=location,
+            murder_time=murder_time,
+            crime_scene_evidence=crime_scene_evidence,
+            witness_statements=witness_statements,
+            forensic_evidence=engine._generate_forensic_evidence(
+                weapon, location, murderer
+            ),
+            red_herrings=[pool[h] for h in self.herrings[i]],
+        )
+
+    def __iter__(self) -> Iterator[GameScenario]:
+        for i in range(len(self)):
+            yield self.scenario(i)
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import re
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    TextPart,
+    ToolCallPart,
+    ToolReturnPart,
+    UserPromptPart,
+)
+from pydantic_ai.models import Model
+from pydantic_ai.models.function import (
+    AgentInfo,
+    DeltaToolCall,
+    FunctionModel,
+)
+from pydantic_ai.usage import RequestUsage
+
+from src.game_engine import CluedoGameEngine
+from src.tool_calls import parse_tool_call
+from src.tool_outputs import ALIBI_SLOTS
+
+"""
+In-process stand-in for LM Studio: deterministic models built on pydantic-ai's FunctionModel.
+- supervisor: plays a checklist (lists, timeline, crime scenes, alibis; the first 4 in one turn with a fan-out),
+  calls process_info once,
+  validates its hypothesis with validate_solution then submits it
+- researcher: picks the tool named in the task and the arguments mentioned in it, then reports the tool output
+- processor: returns the start of the information it received
+Each agent can wait a fixed latency and report fixed token counts, so the orchestration, tools and telemetry
+can be measured (or tested) without a model server.
+The supervisor can also stream its response: the JSON arrives in small chunks spread over its latency,
+followed by `padding` characters of whitespace like the small models emit.
+
+    result = await run_investigation(USER_QUERY, seed=1, backend=ScriptedBackend(latency={"supervisor": 0.5}))
+"""
+
+
+def last_user_prompt(messages: list[ModelMessage]) -> str | None:
+    """User prompt of the last request, None when the model is called back after its tools"""
+    last = messages[-1]
+    if isinstance(last, ModelRequest):
+        for part in last.parts:
+            if isinstance(part, UserPromptPart) and isinstance(part.content, str):
+                return part.content
+    return None
+
+
+def tool_returns(messages: list[ModelMessage]) -> list[ToolReturnPart]:
+    """Tool returns of the last request (the model is called back after running tools)"""
+    last = messages[-1]
+    if not isinstance(last, ModelRequest):
+        return []
+    return [part for part in last.parts if isinstance(part, ToolReturnPart)]
+
+
+class SupervisorPolicy:
+    """Checklist supervisor for one game. Reads the latest finding at the end of its prompt.
+    The 21:30 timeline entry names the murderer and the room, the crime scene of that room gives the weapon.
+    If a report can't be parsed it falls back to checking every room / alibi."""
+
+    def __init__(self):
+        self.steps = [
+            "Use get_suspect_names to get all suspect names",
+            "Use get_weapons_names to get all weapon names",
+            "Use get_room_names to get all room names",
+            f"Use get_timeline_entry for {ALIBI_SLOTS[2]}",
+        ]
+        self.rooms = list(CluedoGameEngine.ROOMS)
+        self.suspects = list(CluedoGameEngine.SUSPECTS)
+        self.asked: str | None = None  # what the last instruction was about
+        self.processed = False
+        self.room: str | None = None
+        self.weapon: str | None = None
+        self.murderer: str | None = None
+        self.validated: dict | None = None
+
+    def observe(self, prompt: str):
+        latest = prompt.rsplit("[RESEARCH]", 1)[-1]
+        seen = re.search(r"(.+?) last seen near the (.+?)\.", latest)
+        if seen and seen.group(1).split(". ")[-1] in CluedoGameEngine.SUSPECTS:
+            self.murderer = seen.group(1).split(". ")[-1]
+            if seen.group(2) in self.rooms:
+                self.rooms.remove(seen.group(2))
+                self.rooms.insert(0, seen.group(2))
+        elif self.asked in CluedoGameEngine.ROOMS and "MURDER SCENE" in latest:
+            self.room = self.asked
+            # verbose, compact or json report
+            item = re.search(r"(?:Item Found|\bitem)\W+([A-Za-z ]+)", latest)
+            if item and item.group(1).strip() in CluedoGameEngine.WEAPONS:
+                self.weapon = item.group(1).strip()
+        elif self.asked in CluedoGameEngine.SUSPECTS and re.search(
+            r"alibi_verified.{0,3}\s*false", latest, re.IGNORECASE
+        ):
+            self.murderer = self.asked
+        self.asked = None
+
+    def next_step(
+        self, messages: list[ModelMessage], batch: bool = False
+    ) -> tuple[str, dict]:
+        """(kind, args) of the next response: delegate/submit for a decision, else a tool name.
+        batch: the decision has a list of tasks, the checklist is asked in one turn"""
+        returns = tool_returns(messages)
+        for part in returns:
+            if part.tool_name == "validate_solution" and isinstance(part.content, dict):
+                self.validated = part.content
+        prompt = last_user_prompt(messages)
+        if prompt is not None:
+            # in conversation mode the prompt shares its request with the previous decision's return
+            self.observe(prompt)
+
+        if self.steps and batch:
+            first, *tasks = self.steps
+            self.steps = []
+            return "delegate", {"instruction": first, "tasks": tasks}
+        if self.steps:
+            return "delegate", {"instruction": self.steps.pop(0)}
+        if not self.processed:
+            self.processed = True
+            return "process_info", {}
+        if self.room is None and self.rooms:
+            self.asked = self.rooms.pop(0)
+            return "delegate", {
+                "instruction": f"Use get_crime_scene_details for the {self.asked}"
+            }
+        if self.murderer is None and self.suspects:
+            self.asked = self.suspects.pop(0)
+            return "delegate", {
+                "instruction": f"Use verify_alibi for {self.asked} at {ALIBI_SLOTS[2]}"
+            }
+
+        hypothesis = {
+            "suspect": self.murderer or CluedoGameEngine.SUSPECTS[0],
+            "weapon": self.weapon or CluedoGameEngine.WEAPONS[0],
+            "location": self.room or CluedoGameEngine.ROOMS[0],
+        }
+        if self.validated is None:
+            return "validate_solution", hypothesis
+        return "submit", {
+            "instruction": f"Suspect: {hypothesis['suspect']}, Weapon: {hypothesis['weapon']}, Room: {hypothesis['location']}"
+        }
+
+
+class ScriptedBackend:
+    """Deterministic models for the 3 agents.
+    latency: seconds per model request, per agent name (supervisor, researcher, processor)
+    input_tokens/output_tokens: fixed token counts per request, None to let pydantic-ai estimate them
+    (streamed responses are always estimated)
+    padding: whitespace after the supervisor's streamed JSON"""
+
+    CHUNK = 8  # characters per streamed chunk
+
+    def __init__(
+        self,
+        latency: dict[str, float] | float = 0.0,
+        input_tokens: int | None = None,
+        output_tokens: int | None = None,
+        padding: int = 0,
+    ):
+        if not isinstance(latency, dict):
+            latency = dict.fromkeys(("supervisor", "researcher", "processor"), latency)
+        self.latency = latency
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.padding = padding
+
+    def models(self, seed: int | None = None) -> dict[str, Model]:
+        """Fresh models for one game (the supervisor policy keeps the game's progress)"""
+        policy = SupervisorPolicy()
+
+        def decide(messages: list[ModelMessage], info: AgentInfo) -> ToolCallPart:
+            output_schema = info.output_tools[0].parameters_json_schema
+            kind, args = policy.next_step(
+                messages, batch="tasks" in output_schema.get("properties", {})
+            )
+            if kind == "delegate":
+                call = ToolCallPart(
+                    info.output_tools[0].name,
+                    {"action": "delegate_to_researcher", **args},
+                )
+            elif kind == "submit":
+                call = ToolCallPart(
+                    info.output_tools[0].name, {"action": "submit_answer", **args}
+                )
+            else:
+                call = ToolCallPart(kind, args)
+            return call
+
+        async def supervisor(messages: list[ModelMessage], info: AgentInfo):
+            return await self._respond("supervisor", messages, [decide(messages, info)])
+
+        async def supervisor_stream(messages: list[ModelMessage], info: AgentInfo):
+            call = decide(messages, info)
+            text = json.dumps(call.args) + " " * self.padding
+            chunks = [text[i : i + self.CHUNK] for i in range(0, len(text), self.CHUNK)]
+            delay = self.latency.get("supervisor", 0.0) / len(chunks)
+            yield {0: DeltaToolCall(name=call.tool_name)}
+            for chunk in chunks:
+                if delay:
+                    await asyncio.sleep(delay)
+                yield {0: DeltaToolCall(json_args=chunk)}
+
+        async def researcher(messages: list[ModelMessage], info: AgentInfo):
+            returns = tool_returns(messages)
+            if returns:
+                parts = [TextPart("\n".join(r.model_response_str() for r in returns))]
+            else:
+                tools = {
+                    tool.name: list(tool.parameters_json_schema.get("properties", {}))
+                    for tool in info.function_tools
+                }
+                call = parse_tool_call(last_user_prompt(messages) or "", tools)
+                if call is None:
+                    parts = [TextPart("No tool matches this task.")]
+                else:
+                    parts = [ToolCallPart(*call)]
+            return await self._respond("researcher", messages, parts)
+
+        async def processor(messages: list[ModelMessage], info: AgentInfo):
+            information = (last_user_prompt(messages) or "").removeprefix(
+                "Information to process: "
+            )
+            summary = f"Key point: {information[:200]}"
+            return await self._respond("processor", messages, [TextPart(summary)])
+
+        return {
+            "supervisor": FunctionModel(
+                supervisor,
+                stream_function=supervisor_stream,
+                model_name="scripted-supervisor",
+            ),
+            "researcher": FunctionModel(researcher, model_name="scripted-researcher"),
+            "processor": FunctionModel(processor, model_name="scripted-processor"),
+        }
+
+    async def _respond(
+        self, agent: str, messages: list[ModelMessage], parts: list
+    ) -> ModelResponse:
+        if self.latency.get(agent):
+            await asyncio.sleep(self.latency[agent])
+        response = ModelResponse(parts=parts)
+        if self.input_tokens is not None or self.output_tokens is not None:
+            response.usage = RequestUsage(
+                input_tokens=self.input_tokens or 0,
+                output_tokens=self.output_tokens or 0,
+            )
+        return response
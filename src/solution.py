@@ -0,0 +1,44 @@
+import re
+
+from src.game_engine import CluedoGameEngine, GameScenario
+
+"""
+Scoring of the supervisor's free-text answer against the scenario.
+"""
+
+# Words that identify a card in a free-text answer ("Suspect: Scarlet, Weapon: Rope, Room: Kitchen")
+# The supervisor often drops the titles ("Scarlet" instead of "Miss Scarlet")
+CARD_KEYWORDS = {
+    "suspect": {s: s.split()[-1] for s in CluedoGameEngine.SUSPECTS},
+    "weapon": {w: w.split()[0] for w in CluedoGameEngine.WEAPONS},
+    "room": {r: r.split()[0] for r in CluedoGameEngine.ROOMS},
+}
+
+
+def parse_solution(answer: str) -> dict[str, str | None]:
+    """Extract suspect, weapon and room from the supervisor's final answer"""
+    parsed = {}
+    for card, keywords in CARD_KEYWORDS.items():
+        # prefer the labelled part of the answer, fallback to the whole text
+        labelled = re.search(rf"{card}\s*[:=-]\s*([^,;\n]+)", answer, re.IGNORECASE)
+        found = None
+        for text in ([labelled.group(1)] if labelled else []) + [answer]:
+            matches = [
+                name
+                for name, keyword in keywords.items()
+                if re.search(rf"\b{keyword}\b", text, re.IGNORECASE)
+            ]
+            if len(matches) == 1:
+                found = matches[0]
+                break
+        parsed[card] = found
+    return parsed
+
+
+def is_correct(answer: str, truth: GameScenario) -> bool:
+    parsed = parse_solution(answer)
+    return (
+        parsed["suspect"] == truth.murderer
+        and parsed["weapon"] == truth.murder_weapon
+        and parsed["room"] == truth.murder_location
+    )
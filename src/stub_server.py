@@ -0,0 +1,279 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.prefetch import CHECKLIST
+from src.tool_calls import parse_tool_call
+
+"""
+Stand-in for LM Studio: a minimal OpenAI compatible server (GET /v1/models, POST /v1/chat/completions,
+streamed or not) to exercise the HTTP pool and the router (src/router.py) without a model.
+It doesn't play well: the supervisor delegates the checklist in a loop, the researcher calls the tool named
+in its task, the processor repeats its input. latency: seconds per completion, error_rate: share of 500s,
+healthy=False: every request fails (to test the ejection).
+
+    python -m src.stub_server --ports 1235 1236 --latency 0.2
+    uv run tournament.py --endpoints http://127.0.0.1:1235/v1 http://127.0.0.1:1236/v1
+
+`python -m src.stub_server --check` checks the router and the early research against a stub server and exits.
+"""
+
+
+class StubServer:
+    def __init__(
+        self,
+        port: int,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        script: list[str] | None = None,
+    ):
+        self.port = port
+        self.script = script or CHECKLIST  # the supervisor's delegations, in a loop
+        self.latency = latency
+        self.error_rate = error_rate
+        self.healthy = True
+        self.requests = 0
+        self._step = 0
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def start(self) -> "StubServer":
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def send_json(self, status: int, body: dict):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                if not stub.healthy:
+                    self.send_json(503, {"error": "unhealthy"})
+                else:
+                    self.send_json(200, {"data": [{"id": "stub", "object": "model"}]})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub._lock:
+                    stub.requests += 1
+                if not stub.healthy or random.random() < stub.error_rate:
+                    self.send_json(500, {"error": {"message": "stub failure"}})
+                    return
+                time.sleep(stub.latency)
+                message = stub.complete(body)
+                if not body.get("stream"):
+                    self.send_json(200, completion(body["model"], message))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for chunk in stream_chunks(body["model"], message):
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.write(b"data: [DONE]\n\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client cancelled the stream
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def complete(self, body: dict) -> dict:
+        """Assistant message answering the request"""
+        messages = body["messages"]
+        tools = {
+            tool["function"]["name"]: list(
+                tool["function"].get("parameters", {}).get("properties", {})
+            )
+            for tool in body.get("tools", [])
+        }
+        if "final_result" in tools:
+            with self._lock:
+                instruction = self.script[self._step % len(self.script)]
+                self._step += 1
+            args = {"action": "delegate_to_researcher", "instruction": instruction}
+            return tool_message("final_result", args)
+        if messages[-1]["role"] == "tool":
+            return {"role": "assistant", "content": messages[-1]["content"]}
+        prompt = messages[-1].get("content") or ""
+        if isinstance(prompt, list):  # content parts
+            prompt = " ".join(part.get("text", "") for part in prompt)
+        call = parse_tool_call(prompt, tools) if tools else None
+        if call is None:
+            return {"role": "assistant", "content": f"Key point: {prompt[:200]}"}
+        return tool_message(*call)
+
+
+def tool_message(name: str, args: dict) -> dict:
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [
+            {
+                "id": f"call_{random.getrandbits(32):08x}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args)},
+            }
+        ],
+    }
+
+
+def usage(message: dict) -> dict:
+    output_tokens = len(json.dumps(message)) // 4
+    return {
+        "prompt_tokens": 100,
+        "completion_tokens": output_tokens,
+        "total_tokens": 100 + output_tokens,
+    }
+
+
+def completion(model: str, message: dict) -> dict:
+    return {
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }
+        ],
+        "usage": usage(message),
+    }
+
+
+def stream_chunks(model: str, message: dict) -> list[dict]:
+    """The whole message in one delta, then the finish reason and the usage"""
+    delta = {"role": "assistant"}
+    if message.get("tool_calls"):
+        delta["tool_calls"] = [
+            {"index": i, **call} for i, call in enumerate(message["tool_calls"])
+        ]
+        finish = "tool_calls"
+    else:
+        delta["content"] = message["content"]
+        finish = "stop"
+    base = {
+        "id": "stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+    }
+    return [
+        {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]},
+        {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": finish}]},
+        {**base, "choices": [], "usage": usage(message)},
+    ]
+
+
+async def check_cancelled_requests(port: int, latency: float = 0.3) -> bool:
+    """A cancelled request frees its router slot: with one slot per endpoint, the next request completes"""
+    from src.agents import process_agent
+    from src.router import ModelRouter
+
+    async def ask(model, stream: bool) -> str:
+        if stream:
+            async with process_agent.run_stream("ping", model=model) as result:
+                return await result.get_output()
+        return (await process_agent.run("ping", model=model)).output
+
+    server = StubServer(port, latency).start()
+    router = ModelRouter([server.base_url], max_concurrency=1)
+    model = router.models()["processor"]
+    ok = True
+    try:
+        for stream in (False, True):
+            cancelled = asyncio.create_task(ask(model, stream))
+            await asyncio.sleep(latency / 2)  # the request is waiting for the server
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+            try:
+                await asyncio.wait_for(ask(model, stream), latency * 10)
+                passed = True
+            except TimeoutError:
+                passed = False
+            print(
+                f"{'stream' if stream else 'request'} cancelled, next one completed: {passed}"
+            )
+            ok &= passed
+    finally:
+        server.stop()
+    return ok
+
+
+async def check_guarded_early_research(port: int) -> bool:
+    """With the guard's force policy and a streamed supervisor, a delegation the guard blocks never starts
+    its research early: the supervisor repeats 2 calls, nothing early is wasted"""
+    from main import USER_QUERY, run_investigation
+    from src.router import ModelRouter
+
+    server = StubServer(port, script=CHECKLIST[:2]).start()
+    try:
+        result = await run_investigation(
+            USER_QUERY,
+            backend=ModelRouter([server.base_url]),
+            guard="force",
+            stream=True,
+            verbose=False,
+        )
+    finally:
+        server.stop()
+    blocked = result["guard"]["blocked_delegations"]
+    early = result["early_dispatch"]
+    print(f"guard blocked {blocked} delegations, early research {early}")
+    return blocked > 0 and early["wasted"] == 0
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="OpenAI compatible stand-in servers")
+    parser.add_argument("--ports", type=int, nargs="+", default=[1235])
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="check the router and the early research on the first port, then exit",
+    )
+    args = parser.parse_args()
+
+    if args.check:
+        ok = asyncio.run(check_cancelled_requests(args.ports[0]))
+        ok &= asyncio.run(check_guarded_early_research(args.ports[0]))
+        raise SystemExit(0 if ok else 1)
+
+    servers = [
+        StubServer(port, args.latency, args.error_rate).start() for port in args.ports
+    ]
+    print("Serving", " ".join(server.base_url for server in servers))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers:
+            server.stop()
@@ -0,0 +1,30 @@
+import time
+from typing import Literal
+
+"""
+Logfire is only imported and configured when a run asks for it (about a second of startup).
+- logfire: send the spans to Logfire, as main.py always did (needs a Logfire account, see the README)
+- local: print the spans to the console only, nothing leaves the machine
+- off: no logfire at all
+
+    configure_telemetry("local")  # before the first game
+"""
+
+TelemetryMode = Literal["logfire", "local", "off"]
+TELEMETRY_MODES = ("logfire", "local", "off")
+
+_configured: TelemetryMode | None = None
+
+
+def configure_telemetry(mode: TelemetryMode = "logfire") -> float:
+    """Set up logfire once per process. Returns the seconds it took"""
+    global _configured
+    if mode == "off" or _configured is not None:
+        return 0.0
+    started = time.perf_counter()
+    import logfire
+
+    logfire.configure(send_to_logfire=False if mode == "local" else None)
+    logfire.instrument_pydantic_ai()
+    _configured = mode
+    return time.perf_counter() - started
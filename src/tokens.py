@@ -0,0 +1,11 @@
+"""
+Rough token count for the accounting reports.
+The models run behind LM Studio and we don't have their tokenizers here, ~4 characters per token is close enough
+to compare two prompt layouts or two output formats.
+"""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
@@ -0,0 +1,230 @@
+import difflib
+import inspect
+import re
+from collections.abc import Callable
+from typing import NamedTuple
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelRequest,
+    ModelResponse,
+    ToolCallPart,
+    ToolReturnPart,
+)
+
+from src.game_engine import CluedoGameEngine
+
+"""
+Normalized view of the tool calls an agent made during a run.
+Two calls with the same tool and the same arguments (modulo spacing and argument order) share the same key.
+parse_instruction reads the call an instruction asks for before any model sees it: tool names (or aliases,
+misspellings, keywords) and card names (full, short or misspelled), time slots and evidence ids.
+"""
+
+OUTPUT_TOOL_NAME = (
+    "final_result"  # pydantic-ai's tool for structured outputs, not a real tool call
+)
+
+
+# Names the supervisor uses for the list tools (its system prompt says "list_suspects")
+TOOL_ALIASES = {
+    "list_suspects": "get_suspect_names",
+    "list_weapons": "get_weapons_names",
+    "list_rooms": "get_room_names",
+}
+
+# Words that point to a tool when the instruction doesn't name it
+TOOL_KEYWORDS = {
+    "get_room_names": ["room names", "list of rooms", "all rooms", "room list"],
+    "get_suspect_names": [
+        "suspect names",
+        "list of suspects",
+        "all suspects",
+        "suspect list",
+    ],
+    "get_weapons_names": [
+        "weapon names",
+        "weapons names",
+        "list of weapons",
+        "all weapons",
+        "weapon list",
+    ],
+    "get_crime_scene_details": ["crime scene"],
+    "get_witness_statement": ["witness statement", "statement"],
+    "get_forensic_evidence": ["forensic"],
+    "get_suspect_background": ["background"],
+    "get_timeline_entry": ["timeline"],
+    "check_fingerprints": ["fingerprint"],
+    "verify_alibi": ["alibi"],
+}
+
+
+def _card_words(names: list[str], word: int) -> dict[str, str]:
+    """Card -> the word that identifies it alone ("Green" for "Mr Green")"""
+    return {name: name.split()[word].lower() for name in names}
+
+
+# Values of the tool arguments that are cards, with their identifying word
+ARGUMENT_VALUES = {
+    "room_name": _card_words(CluedoGameEngine.ROOMS, 0),
+    "witness_name": _card_words(CluedoGameEngine.SUSPECTS, -1),
+    "suspect_name": _card_words(CluedoGameEngine.SUSPECTS, -1),
+    "object_name": _card_words(CluedoGameEngine.WEAPONS, -1)
+    | {"Fabric fibers": "fiber", "Fabric": "fabric"},
+}
+FUZZY_CUTOFF = (
+    0.85  # difflib ratio for misspelled names ("Peacok", "get_witnes_statement")
+)
+
+
+class ParsedCall(NamedTuple):
+    tool_name: str | None
+    args: dict[str, str]
+    problem: str | None  # why the call is not certain, None when it is
+
+
+def tool_parameters(functions: list[Callable]) -> dict[str, list[str]]:
+    """Tool name -> the arguments the model passes (the run context is injected by pydantic-ai)"""
+    return {
+        function.__name__: [
+            name for name in inspect.signature(function).parameters if name != "ctx"
+        ]
+        for function in functions
+    }
+
+
+def find_tools(instruction: str, tools: dict[str, list[str]]) -> list[str]:
+    """Tools named in the instruction, else the ones it misspells, else the ones its keywords point to"""
+    lowered = instruction.lower()
+    for alias, tool_name in TOOL_ALIASES.items():
+        lowered = lowered.replace(alias, tool_name)
+    # "get_witness_statement" contains no other tool name, but keep the longest match to be safe
+    named = [name for name in tools if name in lowered]
+    named = [n for n in named if not any(n != o and n in o for o in named)]
+    if named:
+        return named
+
+    identifiers = re.findall(r"\b[a-z]+(?:_[a-z]+)+\b", lowered)
+    misspelled = {
+        match
+        for identifier in identifiers
+        for match in difflib.get_close_matches(identifier, tools, 1, FUZZY_CUTOFF)
+    }
+    if misspelled:
+        return sorted(misspelled)
+
+    return [
+        name
+        for name in tools
+        if any(keyword in lowered for keyword in TOOL_KEYWORDS.get(name, []))
+    ]
+
+
+def _find_values(instruction: str, param: str) -> list[str]:
+    """Values of the argument found in the instruction"""
+    lowered = instruction.lower()
+    if param in ARGUMENT_VALUES:
+        words = re.findall(r"[a-z]+", lowered)
+        found = []
+        for value, word in ARGUMENT_VALUES[param].items():
+            # whole words only: "rope" is not in "properly"
+            if (
+                re.search(rf"\b{re.escape(value.lower())}\b", lowered)
+                or word in words
+                or difflib.get_close_matches(word, words, 1, FUZZY_CUTOFF)
+            ):
+                found.append(value)
+        # "Fabric fibers" and "Fabric" are the same object for check_fingerprints
+        return list(
+            dict.fromkeys("Fabric fibers" if v == "Fabric" else v for v in found)
+        )
+    if param == "time_slot":
+        slots = []
+        for hour, minute, half in re.findall(
+            r"\b(\d{1,2}):(\d{2})\s*(am|pm)?\b", lowered
+        ):
+            hour = int(hour)
+            if half == "pm" and hour < 12:
+                hour += 12
+            elif not half and 1 <= hour < 12:
+                # a bare "9:30" is the evening (the murder) or the morning: the researcher decides
+                slots.append(f"{hour + 12:02d}:{minute}")
+            slots.append(f"{hour:02d}:{minute}")
+        return list(dict.fromkeys(slots))
+    if param == "evidence_id":
+        return list(
+            dict.fromkeys(
+                match.upper()
+                for match in re.findall(r"\b[a-z]+_[a-z_]+_\d{3}\b", lowered)
+            )
+        )
+    return []
+
+
+def parse_instruction(instruction: str, tools: dict[str, list[str]]) -> ParsedCall:
+    """The single tool call an instruction asks for.
+    problem: no_tool, ambiguous_tool, missing_argument or ambiguous_argument (args are then best guesses)"""
+    named = find_tools(instruction, tools)
+    if not named:
+        return ParsedCall(None, {}, "no_tool")
+    tool_name = named[0]
+    problem = "ambiguous_tool" if len(named) > 1 else None
+
+    args = {}
+    for param in tools[tool_name]:
+        values = _find_values(instruction, param)
+        args[param] = values[0] if values else ""
+        if problem is None and not values:
+            problem = "missing_argument"
+        elif problem is None and len(values) > 1:
+            problem = "ambiguous_argument"
+    return ParsedCall(tool_name, args, problem)
+
+
+def parse_tool_call(
+    instruction: str, tools: dict[str, list[str]]
+) -> tuple[str, dict[str, str]] | None:
+    """Best guess of the tool call of an instruction ("" for the arguments not found).
+    None if no tool is named"""
+    parsed = parse_instruction(instruction, tools)
+    if parsed.tool_name is None:
+        return None
+    return parsed.tool_name, parsed.args
+
+
+def tool_call_key(tool_name: str, args: dict) -> str:
+    normalized = ", ".join(
+        f"{name}={value.strip() if isinstance(value, str) else value!r}"
+        for name, value in sorted(args.items())
+    )
+    return f"{tool_name}({normalized})"
+
+
+def tool_calls(messages: list[ModelMessage]) -> list[ToolCallPart]:
+    """Tool calls requested by the model in these messages, in order"""
+    return [
+        part
+        for message in messages
+        if isinstance(message, ModelResponse)
+        for part in message.parts
+        if isinstance(part, ToolCallPart) and part.tool_name != OUTPUT_TOOL_NAME
+    ]
+
+
+def tool_call_keys(messages: list[ModelMessage]) -> list[str]:
+    return [
+        tool_call_key(call.tool_name, call.args_as_dict())
+        for call in tool_calls(messages)
+    ]
+
+
+def tool_results(messages: list[ModelMessage]) -> list[tuple[ToolCallPart, str]]:
+    """Tool calls with the text of their return ("" if the tool didn't return)"""
+    returns = {
+        part.tool_call_id: part.model_response_str()
+        for message in messages
+        if isinstance(message, ModelRequest)
+        for part in message.parts
+        if isinstance(part, ToolReturnPart)
+    }
+    return [(call, returns.get(call.tool_call_id, "")) for call in tool_calls(messages)]
@@ -0,0 +1,160 @@
+import dataclasses
+import inspect
+import json
+from collections.abc import Callable
+from contextvars import ContextVar
+from typing import Literal
+
+from pydantic_ai import RunContext, Tool
+from pydantic_ai.tools import ToolDefinition
+
+from src.tokens import estimate_tokens
+from src.tool_calls import find_tools
+
+"""
+The tools described once at import: signature, one line description and tool definitions (JSON schemas).
+- full: pydantic-ai's definition, built from the whole docstring (argument descriptions included)
+- compact: the one line description and the bare argument types
+get_tool_list returns the catalog built here. The researcher's definitions go through prepare_tools, once per
+model request, with the options of the game:
+- schemas="compact": the compact definitions
+- subset=True: only the tools the instruction points to (all of them when it points to none)
+The definitions sent and saved are counted per request, in estimated tokens (src/tokens.py).
+
+    result = await run_investigation(USER_QUERY, seed=1, tool_schemas="compact", tool_subset=True)
+    result["tool_schemas"]  # requests, tokens of the full and sent definitions, saved per request
+"""
+
+SchemaMode = Literal["full", "compact"]
+
+
+def compact_schema(schema: dict) -> dict:
+    """The JSON schema without the descriptions of the arguments"""
+    properties = {
+        name: {k: v for k, v in prop.items() if k != "description"}
+        for name, prop in schema.get("properties", {}).items()
+    }
+    return {**schema, "properties": properties}
+
+
+def definition_tokens(definition: ToolDefinition) -> int:
+    """Estimated tokens of a definition as sent to an OpenAI compatible server"""
+    return estimate_tokens(
+        json.dumps(
+            {
+                "name": definition.name,
+                "description": definition.description,
+                "parameters": definition.parameters_json_schema,
+            }
+        )
+    )
+
+
+class ToolSpec:
+    def __init__(self, function: Callable):
+        self.name = function.__name__
+        # the first line of the docstrings says what the tool does
+        docstring = inspect.getdoc(function) or ""
+        self.description = docstring.split("\n")[0].strip() or "No description"
+        # the run context is injected by pydantic-ai, it is not an argument the agents pass
+        signature = inspect.signature(function)
+        params = [p for p in signature.parameters.values() if p.name != "ctx"]
+        self.parameters = [p.name for p in params]
+        self.signature = str(signature.replace(parameters=params)).replace(
+            " -> str", ""
+        )
+        full = Tool(function).tool_def
+        self.compact_schema = compact_schema(full.parameters_json_schema)
+        self.full_tokens = definition_tokens(full)
+        self.compact_tokens = definition_tokens(self.compact(full))
+
+    def compact(self, definition: ToolDefinition) -> ToolDefinition:
+        return dataclasses.replace(
+            definition,
+            description=self.description,
+            parameters_json_schema=self.compact_schema,
+        )
+
+
+class ToolSchemas:
+    """Tool definitions options of one game, and what they saved"""
+
+    def __init__(self, mode: SchemaMode = "full", subset: bool = False):
+        self.mode = mode
+        self.subset = subset
+        self.requests = 0
+        self.tokens_full = 0
+        self.tokens_sent = 0
+
+    def prepare(
+        self,
+        registry: "ToolRegistry",
+        prompt: str | None,
+        definitions: list[ToolDefinition],
+    ) -> list[ToolDefinition]:
+        sent = definitions
+        if self.subset and prompt:
+            keep = registry.relevant(prompt, [d.name for d in definitions])
+            sent = [d for d in definitions if d.name in keep]
+        if self.mode == "compact":
+            sent = [
+                registry.specs[d.name].compact(d) if d.name in registry.specs else d
+                for d in sent
+            ]
+        self.requests += 1
+        self.tokens_full += sum(registry.tokens(d, "full") for d in definitions)
+        self.tokens_sent += sum(registry.tokens(d, self.mode) for d in sent)
+        return sent
+
+    def report(self) -> dict:
+        saved = self.tokens_full - self.tokens_sent
+        return {
+            "mode": self.mode,
+            "subset": self.subset,
+            "requests": self.requests,
+            "tokens_full": self.tokens_full,
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": saved,
+            "saved_per_request": round(saved / self.requests, 1)
+            if self.requests
+            else 0.0,
+        }
+
+
+# tool definitions options of the current game, set by run_investigation
+current_tool_schemas: ContextVar[ToolSchemas | None] = ContextVar(
+    "current_tool_schemas", default=None
+)
+
+
+class ToolRegistry:
+    def __init__(self, functions: list[Callable]):
+        self.specs = {function.__name__: ToolSpec(function) for function in functions}
+        self.parameters = {name: spec.parameters for name, spec in self.specs.items()}
+        self.catalog = "\n    ".join(
+            f"{spec.name}{spec.signature} - {spec.description}"
+            for spec in self.specs.values()
+        )
+
+    def relevant(self, instruction: str, names: list[str]) -> list[str]:
+        """Tools of `names` the instruction points to, all of them when it points to none"""
+        tools = {
+            name: self.parameters[name] for name in names if name in self.parameters
+        }
+        return find_tools(instruction, tools) or names
+
+    def tokens(self, definition: ToolDefinition, mode: SchemaMode) -> int:
+        spec = self.specs.get(definition.name)
+        if spec is None:
+            return definition_tokens(definition)
+        return spec.compact_tokens if mode == "compact" else spec.full_tokens
+
+    async def prepare_tools(
+        self, ctx: RunContext, definitions: list[ToolDefinition]
+    ) -> list[ToolDefinition]:
+        """prepare_tools of an agent: its definitions with the options of the current game"""
+        schemas = current_tool_schemas.get()
+        if schemas is None:
+            return definitions
+        prompt = ctx.prompt if isinstance(ctx.prompt, str) else None
+        return schemas.prepare(self, prompt, definitions)
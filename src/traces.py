@@ -0,0 +1,224 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Self
+
+import polars as pl
+from pydantic_ai.messages import ModelMessage
+from pydantic_ai.usage import RunUsage
+
+from src.tool_calls import tool_results
+
+"""
+Local trace of every game, one flat record per event:
+- supervisor / researcher: one agent run of a turn (decision, instruction, tokens, latency)
+- tool_call: a tool called during that run (name, arguments, output length)
+- outcome: the end of the game (answer, solved, totals)
+- model_response: a complete model response, only with record_responses (see src/replay.py)
+Records are queued by the game (no I/O on the event loop) and written by a background thread in batches,
+to rotating JSONL files or Parquet parts. Works offline, read them back with read_traces().
+
+    with TraceWriter("traces") as tracer:
+        await run_investigation(USER_QUERY, seed=1, tracer=tracer)
+"""
+
+TRACE_SCHEMA = {
+    "run_id": pl.String,
+    "seed": pl.Int64,
+    "event": pl.String,  # supervisor, researcher, tool_call, outcome, model_response
+    "turn": pl.Int64,
+    "timestamp": pl.Float64,
+    "agent": pl.String,
+    "action": pl.String,
+    "instruction": pl.String,
+    "tool_name": pl.String,
+    "tool_args": pl.String,  # json
+    "output_length": pl.Int64,
+    "output_error": pl.Boolean,  # the tool answered with an error message
+    "alibi_verified": pl.Boolean,  # verify_alibi outputs only
+    "input_tokens": pl.Int64,
+    "output_tokens": pl.Int64,
+    "requests": pl.Int64,
+    "latency_s": pl.Float64,
+    "cached": pl.Boolean,  # researcher answer reused from the research cache
+    "direct": pl.Boolean,  # tool called without the researcher model (src/dispatch.py)
+    "solution": pl.String,
+    "submitted": pl.Boolean,
+    "solved": pl.Boolean,
+    "stream": pl.String,  # agent (and task) a model response answers
+    "response": pl.String,  # json of the model response
+}
+
+_CLOSE = object()  # tells the writer thread to flush and stop
+
+
+# verdict of a verify_alibi output in every format: JSON ("alibi_verified":true) or compact (alibi_verified: true)
+ALIBI_VERDICT = re.compile(r'"?alibi_verified"?\s*:\s*"?(\w+)')
+
+
+def alibi_verified(output: str) -> bool | None:
+    """Verdict of a verify_alibi output ("Partial" counts as not verified)"""
+    verdict = ALIBI_VERDICT.search(output)
+    if verdict is None:
+        return None
+    return verdict.group(1) == "true"
+
+
+def agent_records(
+    run_id: str,
+    seed: int | None,
+    turn: int,
+    agent: str,
+    usage: RunUsage,
+    latency: float,
+    messages: list[ModelMessage],
+    **fields,
+) -> list[dict]:
+    """Record of one agent run, followed by one record per tool it called"""
+    now = time.time()
+    base = {"run_id": run_id, "seed": seed, "turn": turn, "agent": agent}
+    records = [
+        {
+            **base,
+            "event": agent,
+            "timestamp": now,
+            "input_tokens": usage.input_tokens,
+            "output_tokens": usage.output_tokens,
+            "requests": usage.requests,
+            "latency_s": latency,
+            **fields,
+        }
+    ]
+    for call, output in tool_results(messages):
+        records.append(
+            {
+                **base,
+                "event": "tool_call",
+                "timestamp": now,
+                "tool_name": call.tool_name,
+                "tool_args": json.dumps(call.args_as_dict()),
+                "output_length": len(output),
+                "output_error": output.startswith(("ERROR", '{"error"')),
+                "alibi_verified": alibi_verified(output),
+            }
+        )
+    return records
+
+
+class TraceWriter:
+    """Buffered append-only writer. `write` only puts the records in a queue, it never blocks.
+    format: jsonl (appended, a new file every max_records) or parquet (one file per max_records, or at close)
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        format: str = "jsonl",
+        max_records: int = 100_000,
+        batch_size: int = 1_000,
+        flush_interval: float = 1.0,
+    ):
+        if format not in ("jsonl", "parquet"):
+            raise ValueError(f"Unknown trace format '{format}', use jsonl or parquet")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.format = format
+        self.max_records = max_records
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        # several writers (processes) can share a directory
+        self.prefix = f"trace-{datetime.now():%Y%m%d-%H%M%S}-{os.getpid()}"
+        self.part = 0
+        self.in_file = 0  # records in the current file
+        self.written = 0
+        self.files: list[Path] = []
+
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._pending: list[dict] = []  # parquet rows waiting for a full file
+        self._thread = threading.Thread(
+            target=self._run, name="trace-writer", daemon=True
+        )
+        self._thread.start()
+
+    def write(self, *records: dict):
+        for record in records:
+            self._queue.put(record)
+
+    def close(self):
+        """Write everything left and stop the thread"""
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                record = self._queue.get(
+                    timeout=max(deadline - time.monotonic(), 0.001)
+                )
+            except queue.Empty:
+                record = None
+            if record is _CLOSE:
+                self._flush(batch, final=True)
+                return
+            if record is not None:
+                batch.append(record)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _path(self) -> Path:
+        path = self.directory / f"{self.prefix}-{self.part:05d}.{self.format}"
+        if path not in self.files:
+            self.files.append(path)
+        return path
+
+    def _flush(self, batch: list[dict], final: bool = False):
+        if self.format == "jsonl":
+            while batch:
+                room = self.max_records - self.in_file
+                chunk, batch = batch[:room], batch[room:]
+                with open(self._path(), "a") as f:
+                    f.writelines(json.dumps(record) + "\n" for record in chunk)
+                self.in_file += len(chunk)
+                self.written += len(chunk)
+                if self.in_file >= self.max_records:
+                    self.part += 1
+                    self.in_file = 0
+            return
+
+        # parquet files can't be appended to: rows wait for a full file
+        self._pending.extend(batch)
+        while len(self._pending) >= self.max_records or (final and self._pending):
+            rows = self._pending[: self.max_records]
+            self._pending = self._pending[self.max_records :]
+            pl.DataFrame(rows, schema=TRACE_SCHEMA).write_parquet(self._path())
+            self.written += len(rows)
+            self.part += 1
+
+
+def read_traces(directory: str | Path) -> pl.LazyFrame:
+    """Every trace file of a directory (jsonl and parquet) as one lazy frame"""
+    directory = Path(directory)
+    frames = []
+    if any(directory.glob("*.jsonl")):
+        frames.append(pl.scan_ndjson(directory / "*.jsonl", schema=TRACE_SCHEMA))
+    if any(directory.glob("*.parquet")):
+        frames.append(pl.scan_parquet(directory / "*.parquet"))
+    if not frames:
+        return pl.LazyFrame(schema=TRACE_SCHEMA)
+    return pl.concat(frames, how="diagonal_relaxed")
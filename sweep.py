@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import multiprocessing
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import polars as pl
+
+from src.telemetry import TELEMETRY_MODES, configure_telemetry
+
+"""
+Prompt and model sweep: every combination of (supervisor prompt, researcher prompt, model) is played on a
+range of seeds. The grid is cut in shards (one combination, shard_size seeds) run by a pool of processes:
+each worker has its own event loop, games, trace writer and feature extraction, so the CPU side scales
+with the cores. A finished shard is a parquet file in the sweep directory: rerunning the same command
+after a crash only plays the missing shards, then the shards of the command are merged in results.parquet.
+The options are part of the shard ids: the same directory with other options plays other shards.
+
+Prompt variants are text files (the name is the file name), "base" is the prompt of src/agents.py.
+A model replaces the model of every agent, "base" keeps the ones of src/agents.py.
+
+uv run sweep.py --seeds 100 --supervisor-prompts prompts/strict.txt prompts/short.txt --workers 4
+uv run sweep.py --seeds 20 --models base qwen3-4b-instruct-2507 --output sweeps/models
+uv run sweep.py --seeds 50 --backend scripted --workers 4  # no model server
+"""
+
+BASE = "base"
+
+
+class ModelVariant:
+    """Backend that plays every agent with one LM Studio model"""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    def models(self, seed: int | None = None) -> dict:
+        from src.agents import AGENTS, LMStudioModel
+
+        return dict.fromkeys(AGENTS, LMStudioModel(self.model_name))
+
+
+def read_variants(paths: list[str] | None) -> dict[str, str | None]:
+    """name -> prompt, None for the base prompt"""
+    variants: dict[str, str | None] = {BASE: None}
+    for path in paths or []:
+        variants[Path(path).stem] = Path(path).read_text()
+    return variants
+
+
+def make_shards(
+    seeds: list[int],
+    supervisor_prompts: dict[str, str | None],
+    researcher_prompts: dict[str, str | None],
+    models: list[str],
+    shard_size: int,
+    run_options: dict,
+) -> list[dict]:
+    """Shards of the grid. The id hashes everything that changes the results: rerunning the same
+    directory with other options plays new shards instead of reusing the old ones"""
+    # the telemetry doesn't change the results
+    options = {k: v for k, v in run_options.items() if k != "telemetry"}
+    shards = []
+    for supervisor, researcher, model in itertools.product(
+        supervisor_prompts, researcher_prompts, models
+    ):
+        for start in range(0, len(seeds), shard_size):
+            shard = {
+                "supervisor_prompt": supervisor,
+                "researcher_prompt": researcher,
+                "model": model,
+                "seeds": seeds[start : start + shard_size],
+                "prompts": {
+                    "supervisor": supervisor_prompts[supervisor],
+                    "researcher": researcher_prompts[researcher],
+                },
+            }
+            # same shard, same id: the prompt texts and the options are part of it, an edited prompt
+            # or another option is a new shard
+            digest = hashlib.sha1(
+                json.dumps({**shard, "options": options}, sort_keys=True).encode()
+            ).hexdigest()
+            shard["id"] = f"{supervisor}-{researcher}-{model}-{start:05d}-{digest[:8]}"
+            shards.append(shard)
+    return shards
+
+
+def run_shard(shard: dict, directory: str, run_options: dict) -> str:
+    """Play one shard in this worker process, write its results and features. Returns the shard id"""
+    from src.agents import override_prompts
+    from src.features import run_features
+    from src.scripted_models import ScriptedBackend
+    from src.traces import TraceWriter, read_traces
+    from tournament import run_tournament
+
+    directory = Path(directory)
+    configure_telemetry(run_options.pop("telemetry"))
+    backend_name = run_options.pop("backend")
+    if backend_name == "scripted":
+        backend = ScriptedBackend(latency=run_options.pop("latency"))
+    else:
+        run_options.pop("latency")
+        backend = None if shard["model"] == BASE else ModelVariant(shard["model"])
+
+    # traces of an interrupted attempt would be counted twice
+    traces_dir = directory / "traces" / shard["id"]
+    shutil.rmtree(traces_dir, ignore_errors=True)
+    tracer = TraceWriter(traces_dir)
+    seeds = shard["seeds"]
+    # only for this shard, the worker plays other variants next
+    with override_prompts(shard["prompts"]):
+        results = asyncio.run(
+            run_tournament(
+                len(seeds),
+                run_options.pop("concurrency"),
+                seeds[0],
+                backend=backend,
+                tracer=tracer,
+                **run_options,
+            )
+        )
+    tracer.close()
+
+    labels = {
+        "shard": shard["id"],
+        "supervisor_prompt": shard["supervisor_prompt"],
+        "researcher_prompt": shard["researcher_prompt"],
+        "model": shard["model"],
+    }
+    features = run_features(read_traces(traces_dir)).collect()
+    write_atomic(
+        features.with_columns(**{k: pl.lit(v) for k, v in labels.items()}),
+        directory / "features" / f"{shard['id']}.parquet",
+    )
+    # written last: a shard with results is done
+    write_atomic(
+        results.with_columns(**{k: pl.lit(v) for k, v in labels.items()}),
+        directory / "shards" / f"{shard['id']}.parquet",
+    )
+    return shard["id"]
+
+
+def write_atomic(frame: pl.DataFrame, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    frame.write_parquet(partial)
+    partial.replace(path)
+
+
+def run_sweep(
+    shards: list[dict], directory: Path, workers: int, run_options: dict
+) -> list[str]:
+    """Play the shards that are not done yet. Returns the ids of the failed shards"""
+    done = {path.stem for path in (directory / "shards").glob("*.parquet")}
+    todo = [shard for shard in shards if shard["id"] not in done]
+    print(f"{len(shards)} shards, {len(shards) - len(todo)} already done")
+    failed = []
+    # spawn: fresh interpreters, no threads (logfire, trace writers) copied from the parent
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(run_shard, shard, str(directory), dict(run_options)): shard
+            for shard in todo
+        }
+        for i, future in enumerate(as_completed(futures), 1):
+            shard = futures[future]
+            try:
+                future.result()
+                print(f"[{i}/{len(todo)}] shard {shard['id']} done")
+            # future.result() re-raises whatever the worker raised (game, parquet, pickling errors) or
+            # BrokenProcessPool: a failed shard is reported and played again by the next run
+            except Exception as e:  # noqa: BLE001
+                # a dead worker breaks the pool: the other shards fail too, rerun to resume
+                failed.append(shard["id"])
+                print(f"[{i}/{len(todo)}] shard {shard['id']} failed: {e!r}")
+    return failed
+
+
+def merge(directory: Path, shards: list[dict]) -> pl.DataFrame:
+    """Results and features of these shards, the directory can hold shards of other options"""
+    paths = [directory / "shards" / f"{shard['id']}.parquet" for shard in shards]
+    results = pl.concat([pl.read_parquet(path) for path in paths if path.exists()])
+    results.write_parquet(directory / "results.parquet")
+    features = [directory / "features" / f"{shard['id']}.parquet" for shard in shards]
+    features = [pl.read_parquet(path) for path in features if path.exists()]
+    if features:
+        pl.concat(features).write_parquet(directory / "features.parquet")
+    return results
+
+
+def summarize(results: pl.DataFrame) -> pl.DataFrame:
+    return (
+        results.group_by("supervisor_prompt", "researcher_prompt", "model")
+        .agg(
+            games=pl.len(),
+            errors=pl.col("error").is_not_null().sum(),
+            win_rate=pl.col("solved").mean(),
+            avg_turns=pl.col("turns").mean(),
+            avg_tokens=pl.col("total_tokens").mean(),
+            avg_game_time_s=pl.col("wall_time").mean(),
+        )
+        .sort("win_rate", descending=True)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep prompts and models over seeds")
+    parser.add_argument("--seeds", type=int, default=20, help="seeds per combination")
+    parser.add_argument("--seed", type=int, default=0, help="first seed")
+    parser.add_argument("--supervisor-prompts", nargs="*", help="prompt files")
+    parser.add_argument("--researcher-prompts", nargs="*", help="prompt files")
+    parser.add_argument(
+        "--models", nargs="*", default=[BASE], help="LM Studio model names"
+    )
+    parser.add_argument("--shard-size", type=int, default=10, help="seeds per shard")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="games at once per worker"
+    )
+    parser.add_argument("--output", default="sweep", help="directory of the sweep")
+    parser.add_argument(
+        "--backend", choices=["lmstudio", "scripted"], default="lmstudio"
+    )
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--memory-budget", type=int, default=1500)
+    parser.add_argument("--conversation", action="store_true")
+    parser.add_argument("--direct-dispatch", action="store_true")
+    parser.add_argument(
+        "--telemetry",
+        choices=TELEMETRY_MODES,
+        default="off",
+        help="of the workers: each one configures its own logfire",
+    )
+    args = parser.parse_args()
+
+    directory = Path(args.output)
+    run_options = {
+        "backend": args.backend,
+        "latency": args.latency,
+        "concurrency": args.concurrency,
+        "memory_budget": args.memory_budget,
+        "conversation": args.conversation,
+        "direct_dispatch": args.direct_dispatch,
+        "telemetry": args.telemetry,
+    }
+    shards = make_shards(
+        list(range(args.seed, args.seed + args.seeds)),
+        read_variants(args.supervisor_prompts),
+        read_variants(args.researcher_prompts),
+        args.models,
+        args.shard_size,
+        run_options,
+    )
+
+    started = time.perf_counter()
+    failed = run_sweep(shards, directory, args.workers, run_options)
+    print(f"Sweep time: {time.perf_counter() - started:.1f}s")
+    if failed:
+        print(f"{len(failed)} shards failed, run the same command again to resume")
+    if len(failed) == len(shards):
+        return
+
+    with pl.Config(tbl_cols=-1, tbl_rows=-1):
+        print(summarize(merge(directory, shards)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+import polars as pl
+from pydantic_ai.exceptions import AgentRunError
+
+from main import USER_QUERY, run_investigation
+from src.agents import RESEARCH_TOOLS
+from src.http_pool import HTTPSettings, http_transport
+from src.metrics import MetricsRegistry
+from src.research_cache import ResearchCache
+from src.response_cache import ResponseCache, ResponseCacheMiss
+from src.scripted_models import ScriptedBackend
+from src.solution import is_correct
+from src.telemetry import TELEMETRY_MODES, configure_telemetry
+from src.tool_calls import tool_parameters
+from src.tool_outputs import OUTPUT_FORMATS
+from src.traces import TraceWriter
+
+"""
+Run many investigations at once on a single event loop.
+Each turn is mostly spent waiting on the LM Studio endpoint, so overlapping games multiplies throughput.
+The concurrency limit protects the local server (and the RAM) from too many parallel requests.
+
+uv run tournament.py --games 200 --concurrency 16 --output results.parquet
+uv run tournament.py --games 500 --concurrency 64 --backend scripted --latency 0.05  # no model server
+uv run tournament.py --games 200 --traces traces/  # record every turn locally
+uv run tournament.py --games 200 --endpoints http://127.0.0.1:1234/v1 http://10.0.0.2:1234/v1  # several servers
+uv run tournament.py --games 200 --metrics metrics.prom --metrics-port 9464  # latency percentiles
+"""
+
+
+async def play_game(
+    game_id: int,
+    seed: int,
+    semaphore: asyncio.Semaphore,
+    user_query: str,
+    run_options: dict,
+) -> dict:
+    async with semaphore:
+        started = time.perf_counter()
+        try:
+            result = await run_investigation(
+                user_query, seed=seed, verbose=False, **run_options
+            )
+        except (AgentRunError, httpx.HTTPError, ResponseCacheMiss) as e:
+            # one broken game (model error or timeout, bad json from the model, usage limit, response
+            # missing from a replayed cache...) should not kill the tournament, a bug in the code should
+            return {
+                "game_id": game_id,
+                "seed": seed,
+                "solved": False,
+                "submitted": False,
+                "turns": None,
+                "input_tokens": None,
+                "output_tokens": None,
+                "total_tokens": None,
+                "requests": None,
+                "memory_tokens_saved": None,
+                "supervisor_shared_ratio": None,
+                "guard_issues": None,
+                "cache_hits": None,
+                "direct_dispatch_rate": None,
+                "prefetch_hit_rate": None,
+                "early_saved_s": None,
+                "tool_tokens_saved": None,
+                "wall_time": time.perf_counter() - started,
+                "error": f"{type(e).__name__}: {e}",
+            }
+
+    usage = result["token_usage"]
+    submitted = result["submitted"]
+    guard = result["guard"] or {}
+    return {
+        "game_id": game_id,
+        "seed": seed,
+        "solved": submitted and is_correct(result["solution"], result["scenario"]),
+        "submitted": submitted,
+        "turns": result["attempts_used"],
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+        "requests": usage.requests,
+        "memory_tokens_saved": result["memory"]["tokens_saved"],
+        "supervisor_shared_ratio": result["prefix_cache"]["per_agent"]["supervisor"][
+            "shared_ratio"
+        ],
+        "guard_issues": sum(guard.get("issues", {}).values()),
+        "cache_hits": result["research_cache"]["hits"],
+        "direct_dispatch_rate": (result["dispatch"] or {}).get("hit_rate"),
+        "prefetch_hit_rate": (result["prefetch"] or {}).get("hit_rate"),
+        "early_saved_s": (result["early_dispatch"] or {}).get("time_saved_s"),
+        "tool_tokens_saved": result["tool_schemas"]["tokens_saved"],
+        "wall_time": result["wall_time"],
+        "error": None,
+    }
+
+
+async def run_tournament(
+    n_games: int,
+    concurrency: int = 8,
+    base_seed: int = 0,
+    user_query: str = USER_QUERY,
+    **run_options,
+) -> pl.DataFrame:
+    """Play n_games investigations concurrently, at most `concurrency` at the same time.
+    Game i is played with seed base_seed + i, run_options are passed to run_investigation.
+    Returns one row per game"""
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def tracked(game_id: int) -> dict:
+        nonlocal done
+        row = await play_game(
+            game_id, base_seed + game_id, semaphore, user_query, run_options
+        )
+        done += 1
+        status = "error" if row["error"] else ("won" if row["solved"] else "lost")
+        print(f"[{done}/{n_games}] game {game_id} (seed {row['seed']}): {status}")
+        return row
+
+    rows = await asyncio.gather(*(tracked(i) for i in range(n_games)))
+    return pl.DataFrame(rows).sort("game_id")
+
+
+def summarize(results: pl.DataFrame, elapsed: float) -> pl.DataFrame:
+    """Aggregate the per game rows into a single row table"""
+    return results.select(
+        pl.len().alias("games"),
+        pl.col("error").is_not_null().sum().alias("errors"),
+        pl.col("solved").mean().alias("win_rate"),
+        pl.col("submitted").mean().alias("submit_rate"),
+        pl.col("turns").mean().alias("avg_turns"),
+        pl.col("total_tokens").mean().alias("avg_tokens"),
+        pl.col("total_tokens").sum().alias("total_tokens"),
+        pl.col("wall_time").mean().alias("avg_game_time_s"),
+        pl.lit(elapsed).alias("tournament_time_s"),
+        (pl.len() / elapsed * 60).alias("games_per_minute"),
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run many Cluedo investigations")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--output", help="write per game results (.csv or .parquet)")
+    parser.add_argument("--memory-budget", type=int, default=1500)
+    parser.add_argument(
+        "--conversation",
+        action="store_true",
+        help="append-only supervisor history (prefix cache friendly)",
+    )
+    parser.add_argument(
+        "--guard",
+        choices=["hint", "force", "stop", "off"],
+        default="hint",
+        help="reaction to loops and stalled turns (src/guard.py)",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=["lmstudio", "scripted"],
+        default="lmstudio",
+        help="scripted: deterministic in-process models, no LM Studio needed",
+    )
+    parser.add_argument(
+        "--endpoints",
+        nargs="+",
+        help="OpenAI compatible servers to spread the requests on (src/router.py)",
+    )
+    parser.add_argument(
+        "--endpoint-concurrency",
+        type=int,
+        default=4,
+        help="requests in flight per endpoint",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="seconds per request of the scripted models",
+    )
+    parser.add_argument(
+        "--shared-cache",
+        action="store_true",
+        help="share the researcher results between games of the same seed",
+    )
+    parser.add_argument(
+        "--direct-dispatch",
+        action="store_true",
+        help="call the tools of unambiguous instructions without the researcher model",
+    )
+    parser.add_argument(
+        "--fan-out",
+        type=int,
+        default=1,
+        help="research tasks the supervisor can run at the same time per turn",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="checklist calls researched ahead while the supervisor thinks",
+    )
+    parser.add_argument(
+        "--prefetch-research",
+        action="store_true",
+        help="prefetch with researcher runs (tokens), not only direct tool calls",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream the supervisor and start the research before its decision is complete",
+    )
+    parser.add_argument(
+        "--tool-schemas",
+        choices=["full", "compact"],
+        default="full",
+        help="compact: one line descriptions and bare argument types for the researcher's tools",
+    )
+    parser.add_argument(
+        "--tool-subset",
+        action="store_true",
+        help="only give the researcher the tools its instruction points to",
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="verbose",
+        help="reports of the researcher's tools: verbose, compact key: value lines or json",
+    )
+    parser.add_argument(
+        "--response-cache",
+        help="SQLite file of the model responses, reruns of a seed are answered from it",
+    )
+    parser.add_argument(
+        "--cache-mode",
+        choices=["record", "replay", "passthrough"],
+        default="record",
+        help="replay: only cached responses, passthrough: don't use the cache",
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=int,
+        default=512,
+        help="least recently used responses are evicted above this size",
+    )
+    parser.add_argument("--traces", help="directory of the turn by turn traces")
+    parser.add_argument("--trace-format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument(
+        "--record-responses",
+        action="store_true",
+        help="add the model responses to the traces, to replay the games (src/replay.py)",
+    )
+    parser.add_argument(
+        "--metrics", help="write the metrics to this file (Prometheus text format)"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="serve the metrics on http://127.0.0.1:PORT/metrics during the run",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=HTTPSettings().max_connections,
+        help="sockets to LM Studio shared by every game",
+    )
+    parser.add_argument(
+        "--max-keepalive",
+        type=int,
+        default=HTTPSettings().max_keepalive_connections,
+        help="idle sockets kept open for the next requests",
+    )
+    parser.add_argument(
+        "--connect-timeout", type=float, default=HTTPSettings().connect_timeout
+    )
+    parser.add_argument(
+        "--read-timeout", type=float, default=HTTPSettings().read_timeout
+    )
+    parser.add_argument(
+        "--telemetry",
+        choices=TELEMETRY_MODES,
+        default="logfire",
+        help="logfire: send the spans, local: print them only, off: no logfire",
+    )
+    args = parser.parse_args()
+    configure_telemetry(args.telemetry)
+    http_transport.configure(
+        HTTPSettings(
+            max_connections=args.max_connections,
+            max_keepalive_connections=args.max_keepalive,
+            connect_timeout=args.connect_timeout,
+            read_timeout=args.read_timeout,
+        )
+    )
+    backend = router = None
+    if args.backend == "scripted":
+        if args.endpoints:
+            parser.error("--endpoints needs the lmstudio backend")
+        backend = ScriptedBackend(latency=args.latency)
+    elif args.endpoints:
+        from src.router import ModelRouter  # imports the openai client
+
+        backend = router = ModelRouter(args.endpoints, args.endpoint_concurrency)
+        router.start_health_checks()
+    tracer = TraceWriter(args.traces, args.trace_format) if args.traces else None
+    metrics = MetricsRegistry()
+    response_cache = (
+        ResponseCache(args.response_cache, args.cache_mode, args.cache_size_mb << 20)
+        if args.response_cache
+        else None
+    )
+    if args.metrics_port:
+        metrics.serve(args.metrics_port)
+
+    started = time.perf_counter()
+    results = await run_tournament(
+        args.games,
+        args.concurrency,
+        args.seed,
+        memory_budget=args.memory_budget,
+        conversation=args.conversation,
+        backend=backend,
+        tracer=tracer,
+        record_responses=args.record_responses,
+        guard=None if args.guard == "off" else args.guard,
+        research_cache=ResearchCache(tool_parameters(RESEARCH_TOOLS))
+        if args.shared_cache
+        else None,
+        direct_dispatch=args.direct_dispatch,
+        fan_out=args.fan_out,
+        prefetch=args.prefetch,
+        prefetch_research=args.prefetch_research,
+        stream=args.stream,
+        tool_schemas=args.tool_schemas,
+        tool_subset=args.tool_subset,
+        output_format=args.output_format,
+        metrics=metrics,
+        response_cache=response_cache,
+    )
+    elapsed = time.perf_counter() - started
+    if router:
+        await router.stop_health_checks()
+        print(f"Endpoints: {router.report()}")
+    if tracer:
+        tracer.close()
+        print(f"{tracer.written} trace records written to {args.traces}")
+
+    with pl.Config(tbl_cols=-1, tbl_rows=-1):
+        print(results)
+        print(summarize(results, elapsed))
+        print(metrics.summary())
+    if args.metrics:
+        metrics.write_prometheus(args.metrics)
+    if response_cache:
+        print(f"Response cache: {response_cache.report()}")
+        response_cache.close()
+    if http_transport.requests:
+        print(f"HTTP connections: {http_transport.report()}")
+
+    if args.output:
+        if args.output.endswith(".parquet"):
+            results.write_parquet(args.output)
+        else:
+            results.write_csv(args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())